@@ -0,0 +1,155 @@
+import argparse
+import collections
+import json
+import multiprocessing
+import sys
+import time
+from board import Board
+from book import book_key
+from symmetry import mirror_col
+
+# Batch position analysis: reads one position per line and writes one JSON line per
+# position, in input order. A position is either a move string, the columns played from
+# the empty board with piece 1 first ("3342", or "3,3,12" for wider boards), or a board
+# dump of rows from top to bottom separated by "/", with "." for empty cells and "1"/"X"
+# or "2"/"O" for the pieces ("......./......./.../...1..."); the piece to move follows
+# from the piece counts. Blank lines and lines starting with "#" are skipped.
+
+
+def parse_position(text, rows=6, cols=7, connect=4):
+    """Returns (board, piece to move) for a move string or board dump."""
+    if "/" in text:
+        lines = text.split("/")
+        if len(lines) != rows or any(len(line) != cols for line in lines):
+            raise ValueError(f"A board dump has {rows} rows of {cols} cells")
+        pieces = {".": 0, "0": 0, "1": 1, "X": 1, "x": 1, "2": 2, "O": 2, "o": 2}
+        board = Board(rows, cols, connect)
+        for c in range(cols):
+            column = [pieces[lines[r][c]] for r in range(rows - 1, -1, -1)]
+            if 0 in column and any(column[column.index(0):]):
+                raise ValueError(f"Floating piece in column {c}")
+            for piece in column:
+                if piece:
+                    board.play(c, piece)
+        ones, twos = bin(board.masks[1]).count("1"), bin(board.masks[2]).count("1")
+        if ones - twos not in (0, 1):
+            raise ValueError("Piece counts do not fit alternating moves from piece 1")
+        piece = 1 if ones == twos else 2
+    else:
+        moves = text.split(",") if "," in text else list(text)
+        board = Board(rows, cols, connect)
+        piece = 1
+        for move in moves:
+            col = int(move)
+            if not 0 <= col < cols or not board.is_valid_location(col):
+                raise ValueError(f"Invalid move {move}")
+            if board.winner_value():
+                raise ValueError("Moves continue after the game ended")
+            board.play(col, piece)
+            piece = 3 - piece
+    if board.winner_value():
+        raise ValueError("The game is over")
+    return board, piece
+
+
+def analyze_position(task):
+    """Worker: analyzes one position with a fresh minMaxPlayer and returns the result
+    with the move in canonical orientation."""
+    board, piece, options = task
+    from player import minMaxPlayer
+    player = minMaxPlayer(piece, piece, None, **options)
+    start = time.perf_counter()
+    try:
+        col = player.choose_move(board)
+    finally:
+        player.close()
+    _, mirrored = book_key(board, piece)
+    return {
+        "col": mirror_col(col, board.get_col()) if mirrored else col,
+        "score": int(player.last_score),
+        "depth": player.last_depth,
+        "source": player.last_source,
+        "nodes": player.nodes,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def analyze(lines, options, workers=None, rows=6, cols=7, connect=4, window=None, cache_size=100000):
+    """Yields one result dict per position line, in input order. At most window
+    positions are in progress at once; results for repeated positions (mirror images
+    included) come from a cache of the last cache_size distinct positions."""
+    pool = multiprocessing.Pool(workers)
+    window = window or 4 * (workers or multiprocessing.cpu_count())
+    cache = collections.OrderedDict()  # entry key -> AsyncResult, move in canonical orientation
+    pending = collections.deque()  # (entry, AsyncResult or None, mirrored) in input order
+    try:
+        for number, line in enumerate(lines, 1):
+            text = line.strip()
+            if not text or text.startswith("#"):
+                continue
+            entry = {"line": number, "input": text}
+            try:
+                board, piece = parse_position(text, rows, cols, connect)
+            except (ValueError, KeyError) as error:
+                entry["error"] = str(error)
+                pending.append((entry, None, False))
+            else:
+                key, mirrored = book_key(board, piece)
+                result = cache.get(key)
+                entry["cached"] = result is not None
+                if result is None:
+                    result = cache[key] = pool.apply_async(analyze_position, ((board, piece, options),))
+                    if len(cache) > cache_size:
+                        cache.popitem(last=False)
+                else:
+                    cache.move_to_end(key)
+                pending.append((entry, result, mirrored))
+            # Finished results go out as soon as the ones before them have; a full window
+            # waits for the oldest, which bounds memory for long inputs
+            while pending and (len(pending) >= window or pending[0][1] is None or pending[0][1].ready()):
+                yield finish(*pending.popleft(), cols)
+        while pending:
+            yield finish(*pending.popleft(), cols)
+    finally:
+        pool.terminate()
+
+
+def finish(entry, result, mirrored, cols):
+    if result is not None:
+        # A position the engine fails on gets an error line; the others still go out
+        try:
+            entry.update(result.get())
+        except Exception as error:
+            entry["error"] = f"{type(error).__name__}: {error}"
+            return entry
+        if mirrored:
+            entry["col"] = mirror_col(entry["col"], cols)
+    return entry
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze positions with minMaxPlayer, one JSON line per position.")
+    parser.add_argument("input", nargs="?", default="-", help="file of positions, - for stdin")
+    parser.add_argument("--depth", type=int, default=6)
+    parser.add_argument("--time-limit", type=float, default=None, help="seconds per position instead of a fixed depth")
+    parser.add_argument("--solver-threshold", type=int, default=16,
+                        help="solve positions with at most this many empty cells exactly (0 to disable)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--rows", type=int, default=6)
+    parser.add_argument("--cols", type=int, default=7)
+    parser.add_argument("--connect", type=int, default=4, help="pieces in a line needed to win")
+    args = parser.parse_args(argv)
+
+    options = {"depth": args.depth, "time_limit": args.time_limit, "solver_threshold": args.solver_threshold}
+    lines = sys.stdin if args.input == "-" else open(args.input)
+    try:
+        for result in analyze(lines, options, args.workers, args.rows, args.cols, args.connect):
+            sys.stdout.write(json.dumps(result) + "\n")
+            sys.stdout.flush()
+    finally:
+        if lines is not sys.stdin:
+            lines.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
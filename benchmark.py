@@ -0,0 +1,218 @@
+import argparse
+import json
+import math
+import platform
+import random
+import sys
+import time
+import numpy as np
+from board import Board
+
+# Fixed positions the benchmarks run on, as moves from the empty 6x7 board with player 1
+# moving first; none of them is decided yet
+CORPUS = {
+    "empty": [],
+    "opening": [3, 3, 2, 4],
+    "middlegame": [3, 3, 3, 2, 4, 4, 2, 5, 1, 3, 4, 2],
+    "crowded": [6, 0, 2, 1, 0, 6, 5, 6, 2, 6, 2, 1, 1, 2, 2, 5, 6, 5, 6, 2, 0, 5, 3, 4],
+}
+# A Connect Six middlegame on a 20x20 board: rows, cols, connect length and moves
+LARGE = (20, 20, 6, [10, 10, 9, 11, 11, 9, 8, 12, 10, 10, 12, 7, 9, 9, 11, 13])
+
+
+def build(moves, rows=6, cols=7, connect=4):
+    """Returns (board, piece to move) after playing moves from the empty board."""
+    board = Board(rows, cols, connect)
+    piece = 1
+    for col in moves:
+        board.play(col, piece)
+        piece = 3 - piece
+    return board, piece
+
+
+def measure(function, min_time=0.2, repeat=3):
+    """Returns the best time per call in seconds over repeat runs of at least min_time."""
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / 10:
+            break
+        calls *= 10
+    calls = max(1, int(calls * min_time / elapsed))
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        best = min(best, (time.perf_counter() - start) / calls)
+    return best
+
+
+def perft(board, piece, depth):
+    """Counts the move sequences of the given length, stopping at finished games."""
+    if depth == 0:
+        return 1
+    count = 0
+    for col in board.get_valid_locations():
+        board.play(col, piece)
+        if depth == 1 or board.winning_move(piece):
+            count += 1
+        else:
+            count += perft(board, 3 - piece, depth - 1)
+        board.undo()
+    return count
+
+
+def bench_board(results, min_time):
+    for name, moves in CORPUS.items():
+        board, piece = build(moves)
+        col = moves[-1] if moves else 3
+        results[f"board.winning_move/{name}"] = {"seconds": measure(lambda: board.winning_move(piece), min_time)}
+        results[f"board.get_next_open_row/{name}"] = {"seconds": measure(lambda: board.get_next_open_row(col), min_time)}
+        results[f"board.get_valid_locations/{name}"] = {"seconds": measure(board.get_valid_locations, min_time)}
+        results[f"board.winner_value/{name}"] = {"seconds": measure(board.winner_value, min_time)}
+        results[f"board.play_undo/{name}"] = {"seconds": measure(lambda: (board.play(col, piece), board.undo()), min_time)}
+
+
+def bench_evaluation(results, min_time):
+    from player import minMaxPlayer
+    player = minMaxPlayer(1, 1, None)
+    window = [1, 1, 0, 2]
+    results["minmax.evaluate_window"] = {"seconds": measure(lambda: player.evaluate_window(window, 1), min_time)}
+    for name, moves in CORPUS.items():
+        board, piece = build(moves)
+        results[f"minmax.score_position/{name}"] = {
+            "seconds": measure(lambda: player.score_position(board, piece), min_time)}
+
+
+def bench_perft(results, depth):
+    for name in ("empty", "middlegame"):
+        board, piece = build(CORPUS[name])
+        start = time.perf_counter()
+        nodes = perft(board, piece, depth)
+        elapsed = time.perf_counter() - start
+        results[f"perft/{name}/depth{depth}"] = {"nodes": nodes, "seconds": elapsed, "nodes_per_sec": nodes / elapsed}
+
+
+def bench_search(results, depth):
+    from player import minMaxPlayer
+    for name, moves in CORPUS.items():
+        board, piece = build(moves)
+        # No endgame solver, so every position runs the same heuristic search
+        player = minMaxPlayer(piece, piece, None, solver_threshold=0)
+        random.seed(0)
+        start = time.perf_counter()
+        col, score = player.search(board, depth)
+        elapsed = time.perf_counter() - start
+        results[f"search/{name}/depth{depth}"] = {"nodes": player.nodes, "seconds": elapsed,
+                                                  "nodes_per_sec": player.nodes / elapsed, "col": col}
+
+
+def bench_large(results, min_time, depth):
+    from player import minMaxPlayer
+    rows, cols, connect, moves = LARGE
+    board, piece = build(moves, rows, cols, connect)
+    player = minMaxPlayer(piece, piece, None)
+    results["large.play_undo"] = {"seconds": measure(lambda: (board.play(10, piece), board.undo()), min_time)}
+    results["large.winner_value"] = {"seconds": measure(board.winner_value, min_time)}
+    results["large.score_position"] = {"seconds": measure(lambda: player.score_position(board, piece), min_time)}
+    random.seed(0)
+    start = time.perf_counter()
+    col, score = player.search(board, depth)
+    elapsed = time.perf_counter() - start
+    results[f"large.search/depth{depth}"] = {"nodes": player.nodes, "seconds": elapsed,
+                                             "nodes_per_sec": player.nodes / elapsed, "col": col}
+
+
+def bench_training(results, episodes):
+    from player import QLearningPlayer
+    random.seed(0)
+    np.random.seed(0)
+    player1 = QLearningPlayer(1, 1, None)
+    player2 = QLearningPlayer(2, 2, None)
+    start = time.perf_counter()
+    player1.train(episodes, 6, 7, player1, player2)
+    elapsed = time.perf_counter() - start
+    results["qlearning.train"] = {"episodes": episodes, "seconds": elapsed, "episodes_per_sec": episodes / elapsed,
+                                  "states": len(player1.stateAction_values)}
+
+
+def run(quick=False, report=print):
+    """Runs every benchmark and returns the results as a JSON-serializable dict."""
+    min_time = 0.05 if quick else 0.2
+    results = {}
+    steps = [
+        ("board", lambda: bench_board(results, min_time)),
+        ("evaluation", lambda: bench_evaluation(results, min_time)),
+        ("perft", lambda: bench_perft(results, 4 if quick else 6)),
+        ("search", lambda: bench_search(results, 4 if quick else 6)),
+        ("large board", lambda: bench_large(results, min_time, 2 if quick else 3)),
+        ("training", lambda: bench_training(results, 200 if quick else 2000)),
+    ]
+    for name, step in steps:
+        if report:
+            report(f"Running {name} benchmarks")
+        step()
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "quick": quick,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold=0.1):
+    """Returns (name, baseline seconds, current seconds) for every benchmark that got
+    more than threshold slower. Node counts must match; a changed count is reported
+    with None times."""
+    regressions = []
+    for name, result in current["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            continue
+        if "nodes" in result and result["nodes"] != old.get("nodes"):
+            regressions.append((name, None, None))
+        elif result["seconds"] > old["seconds"] * (1 + threshold):
+            regressions.append((name, old["seconds"], result["seconds"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark board operations, evaluation, search and training.")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="report benchmarks slower than in this earlier results file")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative slowdown counted as a regression")
+    parser.add_argument("--quick", action="store_true", help="shorter runs and shallower searches")
+    args = parser.parse_args(argv)
+
+    data = run(args.quick)
+    for name, result in data["results"].items():
+        line = f"{name:45} {result['seconds'] * 1e6:12.1f} us"
+        if "nodes_per_sec" in result:
+            line += f"  {result['nodes']} nodes, {result['nodes_per_sec']:.0f} nodes/sec"
+        if "episodes_per_sec" in result:
+            line += f"  {result['episodes_per_sec']:.0f} episodes/sec"
+        print(line)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(data, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline["quick"] != data["quick"]:
+            print("Warning: comparing a quick run with a full one")
+        regressions = compare(baseline, data, args.threshold)
+        for name, old, new in regressions:
+            if old is None:
+                print(f"Node count changed: {name}")
+            else:
+                print(f"Slower: {name} {old * 1e6:.1f} us -> {new * 1e6:.1f} us")
+        return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
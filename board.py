@@ -1,5 +1,5 @@
 import numpy as np
-import pygame
+from evaluation import cell_windows, window_indices
 
 
 # Constants
@@ -10,56 +10,150 @@ YELLOW = (255, 255, 0)
 SQUARESIZE = 100
 CIRCLE_RADIUS = int(SQUARESIZE/2 - 5)
 
+def position_key(board_array):
+    """Returns the Board.position_key of a bare (rows, cols) array of pieces."""
+    rows, cols = board_array.shape
+    key = 0
+    for c in range(cols):
+        key += 1 << (c * (rows + 1))  # column marker, moved up by each piece below
+        for height in range(rows):
+            cell = board_array[rows - 1 - height, c]
+            if cell:
+                key += (2 if cell == 1 else 1) << (c * (rows + 1) + height)
+    return key
+
+
 # Board class handles the game board logic
 class Board:
-    def __init__(self,row,col):
+    def __init__(self,row,col,connect=4):
         self.row = row
         self.col = col
+        self.connect = connect  # pieces in a line needed to win
         self.board = np.zeros((self.row, self.col),dtype=int)
+        self.init_bitboards()
+        self.init_windows()
+
+    def init_bitboards(self):
+        # Bitboard layout: each column takes row+1 bits, bottom cell first. The spare
+        # bit on top of every column keeps shifted lines from wrapping into the next one.
+        self.stride = self.row + 1
+        self.masks = [0, 0, 0]  # masks[piece] holds the cells owned by piece 1 or 2
+        self.heights = [0] * self.col  # number of pieces in each column
+        self.moves = []  # columns played so far, used by undo()
+        self.bottom = sum(1 << (c * self.stride) for c in range(self.col))
+        self.full_mask = self.bottom * ((1 << self.row) - 1)
+        # Unique position key: piece 1's cells plus a marker bit on top of every column
+        self.position_key = self.bottom
+        # Key of the left-right mirror image, used by symmetry.canonical_key
+        self.mirror_key = self.bottom
+
+    def init_windows(self):
+        # Line counters: every window of connect cells in a row, column or diagonal holds
+        # a code, pieces of 1 * (connect + 1) + pieces of 2, and window_counts[code] is the
+        # number of windows with that code. A move updates only the windows through its
+        # cell, so wins are found and positions evaluated without scanning the board.
+        self.cell_windows = cell_windows(self.row, self.col, self.connect)
+        windows = len(window_indices(self.row, self.col, self.connect))
+        self.window_codes = [0] * windows
+        self.window_counts = [0] * (self.connect + 1) ** 2
+        self.window_counts[0] = windows
+        # Code of a window filled by piece 1 or piece 2, and the step each piece adds
+        self.win_codes = (None, self.connect * (self.connect + 1), self.connect)
+        self.code_steps = (None, self.connect + 1, 1)
+
+    def count_windows(self, row, col, step):
+        """Adds step to the code of every window through the cell at (row, col)."""
+        codes = self.window_codes
+        counts = self.window_counts
+        for window in self.cell_windows[row * self.col + col]:
+            code = codes[window]
+            counts[code] -= 1
+            code += step
+            counts[code] += 1
+            codes[window] = code
 
     def create_board(self):
         self.board = np.zeros((self.row, self.col))
+        self.init_bitboards()
+        self.init_windows()
+
+    def copy(self):
+        """Returns an independent copy of the board, bitboards included."""
+        board_copy = Board.__new__(Board)
+        board_copy.__dict__.update(self.__dict__)
+        board_copy.board = np.copy(self.board)
+        board_copy.masks = list(self.masks)
+        board_copy.heights = list(self.heights)
+        board_copy.moves = list(self.moves)
+        board_copy.window_codes = list(self.window_codes)
+        board_copy.window_counts = list(self.window_counts)
+        return board_copy
+
     def get_row(self):
         return self.row
     def get_col(self):
         return self.col
     def drop_piece(self, row, col, piece):
         self.board[row][col] = piece
+        self.count_windows(row, col, self.code_steps[piece])
+        height = self.row - 1 - row
+        bit = 1 << (col * self.stride + height)
+        self.masks[piece] |= bit
+        if height >= self.heights[col]:
+            self.heights[col] = height + 1
+        self.moves.append(col)
+        self.position_key += bit * 2 if piece == 1 else bit
+        mirror_bit = 1 << ((self.col - 1 - col) * self.stride + height)
+        self.mirror_key += mirror_bit * 2 if piece == 1 else mirror_bit
+
+    def play(self, col, piece):
+        """Drops piece into col in place and pushes the move on the move stack."""
+        height = self.heights[col]
+        bit = 1 << (col * self.stride + height)
+        self.board[self.row - 1 - height, col] = piece
+        self.count_windows(self.row - 1 - height, col, self.code_steps[piece])
+        self.masks[piece] |= bit
+        self.heights[col] = height + 1
+        self.moves.append(col)
+        # The column marker moves up one cell (+bit), piece 1 also adds its own cell
+        mirror_bit = 1 << ((self.col - 1 - col) * self.stride + height)
+        if piece == 1:
+            self.position_key += bit * 2
+            self.mirror_key += mirror_bit * 2
+        else:
+            self.position_key += bit
+            self.mirror_key += mirror_bit
+
+    def undo(self):
+        """Takes back the last move and returns its column."""
+        col = self.moves.pop()
+        height = self.heights[col] - 1
+        bit = 1 << (col * self.stride + height)
+        mirror_bit = 1 << ((self.col - 1 - col) * self.stride + height)
+        piece = 1 if self.masks[1] & bit else 2
+        self.masks[piece] ^= bit
+        if piece == 1:
+            self.position_key -= bit * 2
+            self.mirror_key -= mirror_bit * 2
+        else:
+            self.position_key -= bit
+            self.mirror_key -= mirror_bit
+        self.count_windows(self.row - 1 - height, col, -self.code_steps[piece])
+        self.board[self.row - 1 - height, col] = 0
+        self.heights[col] = height
+        return col
 
     def is_valid_location(self, col):
-        return self.board[0][col] == 0
+        return self.heights[col] < self.row
 
     def get_next_open_row(self, col):
-        for r in range(self.row-1, -1, -1):
-            if self.board[r][col] == 0:
-                return r
+        height = self.heights[col]
+        if height < self.row:
+            return self.row - 1 - height
 
     def winning_move(self, piece):
-        # Check horizontal locations
-        for c in range(self.col-3):
-            for r in range(self.row):
-                if (self.board[r][c] == piece and self.board[r][c+1] == piece and
-                    self.board[r][c+2] == piece and self.board[r][c+3] == piece):
-                    return True
-        # Check vertical locations
-        for c in range(self.col):
-            for r in range(self.row-3):
-                if (self.board[r][c] == piece and self.board[r+1][c] == piece and
-                    self.board[r+2][c] == piece and self.board[r+3][c] == piece):
-                    return True
-        # Check positively sloped diagonals
-        for c in range(self.col-3):
-            for r in range(3, self.row):
-                if (self.board[r][c] == piece and self.board[r-1][c+1] == piece and
-                    self.board[r-2][c+2] == piece and self.board[r-3][c+3] == piece):
-                    return True
-        # Check negatively sloped diagonals
-        for c in range(3, self.col):
-            for r in range(3, self.row):
-                if (self.board[r][c] == piece and self.board[r-1][c-1] == piece and
-                    self.board[r-2][c-2] == piece and self.board[r-3][c-3] == piece):
-                    return True
-        return False
+        # A window filled by piece is a line of connect pieces
+        return self.window_counts[self.win_codes[piece]] > 0
 
     def winner_value(self):
         if self.winning_move(1):
@@ -69,29 +163,30 @@ class Board:
             return 2  # Player 2 wins
 
         # Check if the board is full (i.e., a tie)
-        if all(self.board[0][col] != 0 for col in range(self.col)):
+        if self.is_full():
             return 3  # Game is a tie
 
         # No winner, no tie, game is still ongoing
         return 0
 
     def get_valid_locations(self):
-        return [col for col in range(self.col) if self.is_valid_location(col)]
+        return [col for col in range(self.col) if self.heights[col] < self.row]
 
     def is_full(self):
-        return not any(self.is_valid_location(col) for col in range(self.col))
+        return (self.masks[1] | self.masks[2]) == self.full_mask
+
+    def draw_cell(self, screen, r, c):
+        """Draws one cell and returns its rectangle for a partial display update."""
+        import pygame  # only needed when rendering
+        rect = pygame.draw.rect(screen, BLUE, (c * SQUARESIZE, r * SQUARESIZE + SQUARESIZE, SQUARESIZE, SQUARESIZE))
+        color = (WHITE, RED, YELLOW)[self.board[r][c]]
+        pygame.draw.circle(screen, color, (int(c * SQUARESIZE + SQUARESIZE/2),
+                           int(r * SQUARESIZE + SQUARESIZE + SQUARESIZE/2)), CIRCLE_RADIUS)
+        return rect
 
     def draw(self, screen):
+        import pygame  # only needed when rendering
         for c in range(self.col):
             for r in range(self.row):
-                pygame.draw.rect(screen, BLUE, (c * SQUARESIZE, r * SQUARESIZE + SQUARESIZE, SQUARESIZE, SQUARESIZE))
-                if self.board[r][c] == 0:
-                    pygame.draw.circle(screen, WHITE, (int(c * SQUARESIZE + SQUARESIZE/2),
-                                        int(r * SQUARESIZE + SQUARESIZE + SQUARESIZE/2)), CIRCLE_RADIUS)
-                elif self.board[r][c] == 1:
-                    pygame.draw.circle(screen, RED, (int(c * SQUARESIZE + SQUARESIZE/2),
-                                      int(r * SQUARESIZE + SQUARESIZE + SQUARESIZE/2)), CIRCLE_RADIUS)
-                else:
-                    pygame.draw.circle(screen, YELLOW, (int(c * SQUARESIZE + SQUARESIZE/2),
-                                         int(r * SQUARESIZE + SQUARESIZE + SQUARESIZE/2)), CIRCLE_RADIUS)
-        pygame.display.update()
\ No newline at end of file
+                self.draw_cell(screen, r, c)
+        pygame.display.update()
@@ -0,0 +1,161 @@
+import argparse
+import multiprocessing
+import os
+import struct
+import sys
+import time
+import numpy as np
+from board import Board
+from symmetry import canonical_key, mirror_col
+
+# Book file: a header, then the entry keys as sorted int64, the best moves as int8 and
+# the scores as int64. Entries are stored once per mirror pair, in canonical orientation.
+BOOK_MAGIC = b"C4BOOK\0\0"
+BOOK_VERSION = 1
+BOOK_HEADER = struct.Struct("<8sIIIQII28x")  # magic, version, rows, cols, entries, plies, depth
+
+
+def book_key(board, piece):
+    """Returns (entry key, mirrored) for the position with piece to move."""
+    key, mirrored = canonical_key(board)
+    return key * 2 + (piece - 1), mirrored
+
+
+def replay(moves, first_piece, rows, cols):
+    board = Board(rows, cols)
+    piece = first_piece
+    for col in moves:
+        board.play(col, piece)
+        piece = 3 - piece
+    return board, piece
+
+
+def opening_positions(plies, rows=6, cols=7):
+    """Yields (moves, first piece) for every distinct unfinished position with fewer than
+    plies moves played, for either piece moving first, one per mirror pair."""
+    seen = set()
+    for first_piece in (1, 2):
+        frontier = [[]]
+        for ply in range(plies):
+            next_frontier = []
+            for moves in frontier:
+                board, piece = replay(moves, first_piece, rows, cols)
+                key, _ = book_key(board, piece)
+                if key in seen:
+                    continue
+                seen.add(key)
+                yield moves, first_piece
+                for col in board.get_valid_locations():
+                    board.play(col, piece)
+                    if not board.winning_move(piece):
+                        next_frontier.append(moves + [col])
+                    board.undo()
+            frontier = next_frontier
+
+
+def search_position(task):
+    """Worker: searches one book position and returns (entry key, move, score)."""
+    moves, first_piece, depth, rows, cols = task
+    from player import minMaxPlayer
+    board, piece = replay(moves, first_piece, rows, cols)
+    player = search_position.players.get(piece)
+    if player is None:
+        # One player per piece and process, so its transposition table is reused
+        player = search_position.players[piece] = minMaxPlayer(piece, piece, None)
+    col, score = player.search(board, depth)
+    key, mirrored = book_key(board, piece)
+    return key, mirror_col(col, cols) if mirrored else col, score
+
+
+search_position.players = {}
+
+
+def build_book(path, plies=4, depth=6, rows=6, cols=7, workers=None, report=print):
+    """Searches every opening position with fewer than plies moves to the given depth and
+    writes the best moves and scores to path. Returns the number of entries."""
+    tasks = [(moves, first_piece, depth, rows, cols) for moves, first_piece in opening_positions(plies, rows, cols)]
+    start = time.perf_counter()
+    if workers == 1:
+        results = map(search_position, tasks)
+    else:
+        pool = multiprocessing.Pool(workers)
+        results = pool.imap_unordered(search_position, tasks, chunksize=4)
+    entries = []
+    for i, entry in enumerate(results, 1):
+        entries.append(entry)
+        if report and i % 100 == 0:
+            report(f"{i}/{len(tasks)} positions searched ({time.perf_counter() - start:.0f}s)")
+    if workers != 1:
+        pool.close()
+        pool.join()
+
+    entries.sort()
+    keys = np.array([key for key, _, _ in entries], dtype="<i8")
+    moves = np.array([move for _, move, _ in entries], dtype="i1")
+    scores = np.array([score for _, _, score in entries], dtype="<i8")
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(BOOK_HEADER.pack(BOOK_MAGIC, BOOK_VERSION, rows, cols, len(entries), plies, depth))
+        f.write(keys.tobytes())
+        f.write(moves.tobytes())
+        f.write(b"\0" * (-f.tell() % 8))
+        f.write(scores.tobytes())
+    os.replace(temporary, path)
+    return len(entries)
+
+
+# OpeningBook looks moves up in a book file; the file is only opened and memory-mapped
+# on the first lookup, and pages are read on demand
+class OpeningBook:
+    def __init__(self, path):
+        self.path = path
+        self.keys = None
+
+    def open(self):
+        with open(self.path, "rb") as f:
+            magic, version, self.rows, self.cols, count, self.plies, self.depth = \
+                BOOK_HEADER.unpack(f.read(BOOK_HEADER.size))
+        if magic != BOOK_MAGIC:
+            raise ValueError("Not an opening book file")
+        if version != BOOK_VERSION:
+            raise ValueError(f"Unsupported opening book version {version}")
+        offset = BOOK_HEADER.size
+        if count == 0:
+            self.keys = np.zeros(0, dtype="<i8")
+            return
+        self.keys = np.memmap(self.path, dtype="<i8", mode="r", offset=offset, shape=(count,))
+        offset += count * 8
+        self.moves = np.memmap(self.path, dtype="i1", mode="r", offset=offset, shape=(count,))
+        offset += count + (-(offset + count) % 8)
+        self.scores = np.memmap(self.path, dtype="<i8", mode="r", offset=offset, shape=(count,))
+
+    def lookup(self, board, piece):
+        """Returns (col, score) for the position with piece to move, or None if the
+        position is not in the book."""
+        if self.keys is None:
+            self.open()
+        if board.get_row() != self.rows or board.get_col() != self.cols or len(board.moves) >= self.plies:
+            return None
+        if board.connect != 4:
+            return None  # books are built for Connect Four
+        key, mirrored = book_key(board, piece)
+        i = int(np.searchsorted(self.keys, key))
+        if i == len(self.keys) or self.keys[i] != key:
+            return None
+        col = int(self.moves[i])
+        return (mirror_col(col, self.cols) if mirrored else col), int(self.scores[i])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build an opening book for minMaxPlayer.")
+    parser.add_argument("path")
+    parser.add_argument("--plies", type=int, default=4, help="book positions have fewer moves than this")
+    parser.add_argument("--depth", type=int, default=6, help="search depth for each position")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+    count = build_book(args.path, args.plies, args.depth, workers=args.workers)
+    print(f"Wrote {count} positions to {args.path}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
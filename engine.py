@@ -0,0 +1,101 @@
+import threading
+from instrumentation import SearchRecorder
+from player import SearchTimeout
+
+# Runs minMaxPlayer searches on a worker thread so the GUI event loop keeps running, and
+# ponders: while the opponent is choosing, the player searches the positions after the
+# opponent's likely replies, filling its transposition table and remembering its answer
+# for each, so the search after the actual reply is instant or starts from that work.
+
+
+class BackgroundSearch:
+    """Chooses the player's move for a copy of board on a worker thread. With a Ponder
+    that already answered this position, the answer is used without searching, and
+    recorded to the player's sink like a searched move."""
+
+    def __init__(self, player, board, ponder=None):
+        self.player = player
+        self.board = board.copy()
+        self.col = None
+        self.error = None
+        self.pondered = False
+        answer = ponder.answer(board) if ponder is not None else None
+        if answer is not None:
+            self.col, player.last_score, player.last_depth, player.last_source, player.nodes = answer
+            self.pondered = True
+            self.thread = None
+            if player.sink is not None:
+                with SearchRecorder(player, self.board) as recorder:
+                    pass
+                player.sink.write(recorder.record(self.col))
+        else:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+
+    def run(self):
+        try:
+            self.col = self.player.choose_move(self.board)
+        except SearchTimeout:
+            pass  # cancelled
+        except Exception as error:
+            self.error = error
+
+    def done(self):
+        """True once the move is chosen (or the search was cancelled)."""
+        return self.thread is None or not self.thread.is_alive()
+
+    def result(self):
+        """Returns the chosen column; re-raises an error of the search."""
+        if self.error is not None:
+            raise self.error
+        return self.col
+
+    def cancel(self):
+        if self.thread is not None:
+            stop(self.player, self.thread)
+
+
+class Ponder:
+    """Searches the positions after each of the opponent's replies to board, the most
+    likely first, on a worker thread until cancelled or every reply is answered."""
+
+    def __init__(self, player, board):
+        self.player = player
+        self.board = board.copy()
+        self.opponent = 1 if player.piece == 2 else 2
+        self.answers = {}  # position key after the reply -> (col, score, depth, source, nodes)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        player = self.player
+        board = self.board
+        replies = player.order_moves(board, board.get_valid_locations(), self.opponent, None)
+        for reply in replies:
+            board.play(reply, self.opponent)
+            if not board.winning_move(self.opponent) and not board.is_full():
+                try:
+                    col = player.select_move(board)
+                except SearchTimeout:
+                    return
+                if player.stop_requested:
+                    return  # a budgeted search returns early when stopped; don't keep that
+                self.answers[board.position_key] = (col, player.last_score, player.last_depth, player.last_source,
+                                                    player.nodes)
+            board.undo()
+
+    def answer(self, board):
+        """Stops pondering and returns the answer for board, or None."""
+        self.cancel()
+        return self.answers.get(board.position_key)
+
+    def cancel(self):
+        stop(self.player, self.thread)
+
+
+def stop(player, thread):
+    """Stops the player's search on thread and waits for the thread to finish."""
+    if thread.is_alive():
+        player.stop()
+        thread.join()
+    player.stop_requested = False
@@ -0,0 +1,67 @@
+import operator
+import numpy as np
+from functools import lru_cache
+
+WINDOW_LENGTH = 4
+
+
+@lru_cache(maxsize=None)
+def window_indices(rows, cols, length=WINDOW_LENGTH):
+    """Returns a (windows, length) array with the flat board index of every cell of every
+    horizontal, vertical and diagonal window of length cells."""
+    cells = np.arange(rows * cols).reshape(rows, cols)
+    windows = []
+    # Horizontal
+    for r in range(rows):
+        for c in range(cols - length + 1):
+            windows.append(cells[r, c:c + length])
+    # Vertical
+    for c in range(cols):
+        for r in range(rows - length + 1):
+            windows.append(cells[r:r + length, c])
+    # Positive and negative sloped diagonals
+    for r in range(rows - length + 1):
+        for c in range(cols - length + 1):
+            windows.append([cells[r + i][c + i] for i in range(length)])
+    for r in range(rows - length + 1):
+        for c in range(cols - length + 1):
+            windows.append([cells[r + length - 1 - i][c + i] for i in range(length)])
+    indices = np.array(windows, dtype=np.intp).reshape(-1, length)
+    indices.flags.writeable = False
+    return indices
+
+
+@lru_cache(maxsize=None)
+def cell_windows(rows, cols, length=WINDOW_LENGTH):
+    """Returns, for every flat board index, the tuple of windows containing that cell."""
+    windows = [[] for _ in range(rows * cols)]
+    for window, cells in enumerate(window_indices(rows, cols, length).tolist()):
+        for cell in cells:
+            windows[cell].append(window)
+    return tuple(tuple(cell) for cell in windows)
+
+
+# WindowEvaluator scores a board from its window counters (see Board.window_counts)
+class WindowEvaluator:
+    def __init__(self, rows, cols, window_score, length=WINDOW_LENGTH):
+        """window_score(window, piece) scores one window given as a list of length cells.
+        It may only depend on how many cells of each piece the window holds, and is
+        evaluated once for every possible pair of counts and each piece."""
+        self.rows = rows
+        self.cols = cols
+        self.length = length
+        self.center_mask = ((1 << rows) - 1) << (cols // 2 * (rows + 1))
+        # Indexed like Board.window_counts: pieces of 1 * (length + 1) + pieces of 2
+        self.tables = [None]
+        for piece in (1, 2):
+            table = [0] * (length + 1) ** 2
+            for ones in range(length + 1):
+                for twos in range(length + 1 - ones):
+                    window = [1] * ones + [2] * twos + [0] * (length - ones - twos)
+                    table[ones * (length + 1) + twos] = window_score(window, piece)
+            self.tables.append(table)
+
+    def score(self, board, piece):
+        """Returns the center column bonus plus the sum of all window scores."""
+        center_count = (board.masks[piece] & self.center_mask).bit_count()
+        return center_count * 6 + sum(map(operator.mul, board.window_counts, self.tables[piece]))
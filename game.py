@@ -1,9 +1,12 @@
 import pygame
 import sys
 import random
-import math
+import time
+import numpy as np
 from board import Board
-from player import HumanPlayer, minMaxPlayer, QLearningPlayer, RandomPlayer
+from engine import BackgroundSearch, Ponder
+from records import GameRecordWriter
+from player import HumanPlayer, minMaxPlayer, MCTSPlayer, QLearningPlayer, RandomPlayer
 
 ROWS = 6
 COLS = 7
@@ -17,6 +20,8 @@ PLAYER_TURN = 0
 AI_TURN = 1
 PLAYER_PIECE = 1
 AI_PIECE = 2
+FPS = 30  # frame cap of the event loop
+RECORD_PATH = "games.c4r"  # game record log written by the batch run below
 
 class Game:
     def __init__(self, player1, player2):
@@ -27,17 +32,46 @@ class Game:
         self.game_over = False
         self.not_over = [True]
         self.draw = False
+        self.start_recording()
         pygame.init()
         self.width = COLS * SQUARESIZE
         self.height = (ROWS + 1) * SQUARESIZE
         self.circle_radius = int(SQUARESIZE / 2 - 5)
         self.screen = pygame.display.set_mode((self.width, self.height))
         self.font = pygame.font.SysFont("monospace", 30)
+        self.clock = pygame.time.Clock()
+        self.top_strip = pygame.Rect(0, 0, self.width, SQUARESIZE)
+        self.dirty = []  # screen rectangles changed since the last display update
+        self.thinking = None  # BackgroundSearch of the AI player to move
+        self.ponder = None  # Ponder of the AI player while a human chooses
         self.draw_board()
         pygame.display.update()
 
     def draw_board(self):
+        # Full redraw, then only the cells that change are drawn again
         self.board.draw(self.screen)
+        self.drawn = self.board.board.copy()
+
+    def update_board(self):
+        # Redraws the cells that changed since they were last drawn, and the top strip
+        # where the hover piece and messages are
+        for r, c in np.argwhere(self.board.board != self.drawn):
+            self.dirty.append(self.board.draw_cell(self.screen, r, c))
+        self.drawn[:] = self.board.board
+        self.dirty.append(self.top_strip)
+
+    def flush(self):
+        if self.dirty:
+            pygame.display.update(self.dirty)
+            self.dirty = []
+
+    def stop_thinking(self):
+        if self.thinking is not None:
+            self.thinking.cancel()
+            self.thinking = None
+        if self.ponder is not None:
+            self.ponder.cancel()
+            self.ponder = None
 
     def end_game(self):
         self.game_over = True
@@ -48,55 +82,86 @@ class Game:
         self.current_player = self.players[self.turn]
         self.game_over = False
         self.not_over = [True]
+        self.start_recording()
         self.draw_board()
         pygame.display.update()
 
+    def start_recording(self):
+        self.first_piece = self.current_player.piece
+        self.think_times = []
+        self.turn_start = time.perf_counter()
+
+    def next_turn(self):
+        # One think time per move played; an invalid click passes the turn without a move
+        if len(self.think_times) < len(self.board.moves):
+            self.think_times.append(time.perf_counter() - self.turn_start)
+        self.turn = (self.turn + 1) % 2
+        self.current_player = self.players[self.turn]
+        self.turn_start = time.perf_counter()
+
+    def record(self, writer, seed=-1):
+        """Appends the finished game to a GameRecordWriter."""
+        names = [type(player).__name__ for player in sorted(self.players, key=lambda player: player.piece)]
+        writer.write(self.board.moves, self.board.winner_value(), self.first_piece, names, self.think_times,
+                     seed, ROWS, COLS)
+
     def run(self):
         winner = None  # Track the winner
         while not self.game_over:
+            # While a human chooses, a minimax opponent searches the likely replies
+            opponent = self.players[(self.turn + 1) % 2]
+            if isinstance(self.current_player, HumanPlayer) and isinstance(opponent, minMaxPlayer) \
+                    and self.ponder is None and self.not_over[0]:
+                self.ponder = Ponder(opponent, self.board)
+
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
+                    self.stop_thinking()
                     sys.exit()
 
                 if event.type == pygame.MOUSEMOTION and self.not_over[0]:
-                    pygame.draw.rect(self.screen, BLACK, (0, 0, self.width, SQUARESIZE))
+                    pygame.draw.rect(self.screen, BLACK, self.top_strip)
                     xpos = pygame.mouse.get_pos()[0]
                     if self.turn == PLAYER_TURN:
                         pygame.draw.circle(self.screen, RED, (xpos, int(SQUARESIZE / 2)), self.circle_radius)
+                    self.dirty.append(self.top_strip)
 
                 if event.type == pygame.MOUSEBUTTONDOWN and self.not_over[0]:
-                    pygame.draw.rect(self.screen, BLACK, (0, 0, self.width, SQUARESIZE))
+                    pygame.draw.rect(self.screen, BLACK, self.top_strip)
+                    self.dirty.append(self.top_strip)
                     if isinstance(self.current_player, HumanPlayer):
                         xpos = event.pos[0]
                         col = int(xpos // SQUARESIZE)
                         self.current_player.make_move(self.board, self.font, self.screen, self.not_over, self.end_game, col)
-                        self.draw_board()
-                        self.turn = (self.turn + 1) % 2
-                        self.current_player = self.players[self.turn]
-
-                pygame.display.update()
+                        self.update_board()
+                        self.next_turn()
 
-            if isinstance(self.current_player, minMaxPlayer) and not self.game_over and self.not_over[0]:
-                col, minimax_score = self.current_player.minimax(self.board, 5, -math.inf, math.inf, True)
-                if self.board.is_valid_location(col):
-                    self.current_player.make_move(self.board, self.font, self.screen, self.not_over, self.end_game, col)
-                self.draw_board()
-                self.turn = (self.turn + 1) % 2
-                self.current_player = self.players[self.turn]
+            # The search runs on a worker thread; the loop keeps handling events until it is
+            # done and the player's move delay has passed
+            if isinstance(self.current_player, (minMaxPlayer, MCTSPlayer)) and not self.game_over and self.not_over[0]:
+                if self.thinking is None:
+                    self.thinking = BackgroundSearch(self.current_player, self.board, self.ponder)
+                    self.ponder = None
+                elif self.thinking.done() and \
+                        time.perf_counter() - self.turn_start >= self.current_player.move_delay / 1000:
+                    col = self.thinking.result()
+                    self.thinking = None
+                    if col is not None and self.board.is_valid_location(col):
+                        self.current_player.make_move(self.board, self.font, self.screen, self.not_over, self.end_game, col)
+                    self.update_board()
+                    self.next_turn()
 
             if isinstance(self.current_player, QLearningPlayer) and not self.game_over and self.not_over[0]:
                 best_move = self.current_player.find_best_move(self.board)
                 if self.board.is_valid_location(best_move):
                     self.current_player.make_move(self.board, self.font, self.screen, self.not_over, self.end_game, best_move)
-                self.draw_board()
-                self.turn = (self.turn + 1) % 2
-                self.current_player = self.players[self.turn]
+                self.update_board()
+                self.next_turn()
 
             if isinstance(self.current_player, RandomPlayer) and not self.game_over and self.not_over[0]:
                 self.current_player.make_move(self.board, self.font, self.screen, self.not_over, self.end_game)
-                self.draw_board()
-                self.turn = (self.turn + 1) % 2
-                self.current_player = self.players[self.turn]
+                self.update_board()
+                self.next_turn()
 
             # Check for game over and determine the winner
             # if not self.not_over[0]:
@@ -107,18 +172,23 @@ class Game:
             #     self.end_game()
 
             if not any(self.board.is_valid_location(col) for col in range(COLS)) and not self.game_over:
-                pygame.draw.rect(self.screen, BLACK, (0, 0, self.width, SQUARESIZE))
+                pygame.draw.rect(self.screen, BLACK, self.top_strip)
                 label = self.font.render("Draw!", True, (255, 255, 255))
                 self.screen.blit(label, (40, 10))
-                pygame.display.update()
+                self.dirty.append(self.top_strip)
+                self.flush()
                 pygame.time.wait(3000)
                 self.draw = True
                 self.end_game()
+
+            self.flush()
+            self.clock.tick(FPS)
+        self.stop_thinking()
         if self.draw:
              winner = 0
-        if isinstance(self.current_player, QLearningPlayer):
+        elif isinstance(self.current_player, QLearningPlayer):
             winner = self.current_player.player_number
-        elif isinstance(self.current_player,RandomPlayer) or isinstance(self.current_player, minMaxPlayer):
+        elif isinstance(self.current_player, (RandomPlayer, minMaxPlayer, MCTSPlayer)):
             winner = self.players[(self.turn + 1) % 2].player_number
         elif isinstance(self.players[(self.turn + 1) % 2], QLearningPlayer):
             winner = self.players[(self.turn + 1) % 2].player_number
@@ -131,11 +201,17 @@ if __name__ == "__main__":
     total_moves_2 = 0
     player1_wins = 0
     player2_wins = 0
+    tie_game = 0
     total_games = 100
+    records = GameRecordWriter(RECORD_PATH)
     # Instantiate Q-Learning players
     # q_learning_player1 = QLearningPlayer(1, 1, RED)
     # q_learning_player2 = QLearningPlayer(2, 2, YELLOW)
     # q1, q2 = q_learning_player1.train(1000, ROWS, COLS, q_learning_player1, q_learning_player2)
+    # q1.save("qtable_player1.c4q"); q2.save("qtable_player2.c4q")
+    # Later runs can skip training and share the saved tables:
+    # q1 = QLearningPlayer(1, 1, RED, table_path="qtable_player1.c4q")
+    # q2 = QLearningPlayer(2, 2, YELLOW, table_path="qtable_player2.c4q")
 
     for i in range(total_games):
         print(f"Starting Game {i + 1}")
@@ -156,7 +232,7 @@ if __name__ == "__main__":
 
         game = Game(player1, player2)
         winner, move_count = game.run()  # Capture the winner and move count
-        tie_game  = 0
+        game.record(records)
         # Track the winner and their move count
         # print(winner,move_count)
         if winner == 0 :
@@ -172,6 +248,8 @@ if __name__ == "__main__":
         game.reset()
 
 
+    records.close()
+
     # Calculate and print statistics after 10 games
     avg_moves1 = total_moves_1 / total_games
     avg_moves2 = total_moves_2 / total_games
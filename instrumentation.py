@@ -0,0 +1,164 @@
+import json
+import time
+from symmetry import canonical_key, mirror_col
+
+# Opt-in statistics for minMaxPlayer moves. A player with a sink records every move it
+# chooses: while the move is searched, the player's and board's hot methods are wrapped
+# by counting and timing versions, which are removed again afterwards, so a player
+# without a sink runs exactly the code it would run without this module.
+
+
+class MemorySink:
+    """Keeps the records in a list."""
+
+    def __init__(self):
+        self.records = []
+
+    def write(self, record):
+        self.records.append(record)
+
+    def close(self):
+        pass
+
+
+class JsonLinesSink:
+    """Appends every record as one JSON line to a file."""
+
+    def __init__(self, path):
+        self.file = open(path, "a")
+
+    def write(self, record):
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class SearchRecorder:
+    def __init__(self, player, board):
+        self.player = player
+        self.board = board
+        self.root_moves = len(board.moves)
+        self.leaf_evaluations = 0
+        self.terminal_hits = 0
+        self.cutoffs = {}  # ply from the root -> number of cutoffs
+        self.first_move_cutoffs = 0
+        self.times = {"score_position": 0.0, "winning_move": 0.0, "ordering": 0.0}
+
+    def timed(self, name, function):
+        times = self.times
+
+        def wrapper(*args):
+            start = time.perf_counter()
+            result = function(*args)
+            times[name] += time.perf_counter() - start
+            return result
+        return wrapper
+
+    def __enter__(self):
+        player = self.player
+        score_position = self.timed("score_position", player.score_position)
+        is_terminal_node = player.is_terminal_node
+        ordering = player.move_ordering(self.board)
+        cutoff = ordering.cutoff
+
+        def counted_score_position(board, piece):
+            self.leaf_evaluations += 1
+            return score_position(board, piece)
+
+        def counted_is_terminal_node(board):
+            terminal = is_terminal_node(board)
+            self.terminal_hits += bool(terminal)
+            return terminal
+
+        def counted_cutoff(board, col, piece, depth, index):
+            ply = len(board.moves) - self.root_moves
+            self.cutoffs[ply] = self.cutoffs.get(ply, 0) + 1
+            self.first_move_cutoffs += index == 0
+            cutoff(board, col, piece, depth, index)
+
+        player.score_position = counted_score_position
+        player.is_terminal_node = counted_is_terminal_node
+        player.order_moves = self.timed("ordering", player.order_moves)
+        ordering.cutoff = counted_cutoff
+        self.board.winning_move = self.timed("winning_move", self.board.winning_move)
+        self.ordering = ordering
+        self.tt_before = player.tt.hits, player.tt.misses
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.seconds = time.perf_counter() - self.start
+        for name in ("score_position", "is_terminal_node", "order_moves"):
+            del self.player.__dict__[name]
+        del self.ordering.__dict__["cutoff"]
+        del self.board.__dict__["winning_move"]
+        return False
+
+    def principal_variation(self, depth):
+        """Follows the transposition table moves from the root."""
+        player = self.player
+        board = self.board
+        piece = player.piece
+        maximizing = True
+        variation = []
+        while len(variation) < depth:
+            position_key, mirrored = canonical_key(board)
+            entry = player.tt.probe(position_key * 2 + maximizing)
+            if entry is None or entry[3] is None:
+                break
+            col = mirror_col(entry[3], board.get_col()) if mirrored else entry[3]
+            if not board.is_valid_location(col):
+                break
+            board.play(col, piece)
+            variation.append(col)
+            if board.winning_move(piece):
+                break
+            piece = 3 - piece
+            maximizing = not maximizing
+        for _ in variation:
+            board.undo()
+        return variation
+
+    def record(self, col):
+        player = self.player
+        hits, misses = player.tt.hits - self.tt_before[0], player.tt.misses - self.tt_before[1]
+        depth = player.last_depth
+        searched = player.last_source == "search"
+        record = {
+            "move": self.root_moves + 1,
+            "piece": player.piece,
+            "col": col,
+            "score": int(player.last_score),
+            "depth": depth,
+            "source": player.last_source,
+            "seconds": self.seconds,
+            "nodes": player.nodes,
+            "leaf_evaluations": self.leaf_evaluations,
+            "terminal_hits": self.terminal_hits,
+            "cutoffs_by_ply": [self.cutoffs.get(ply, 0) for ply in range(max(self.cutoffs, default=-1) + 1)],
+            "first_move_cutoffs": self.first_move_cutoffs,
+            "tt_hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "time_score_position": self.times["score_position"],
+            "time_winning_move": self.times["winning_move"],
+            "time_ordering": self.times["ordering"],
+            # b such that b + b^2 + ... + b^depth is the number of nodes searched
+            "branching_factor": branching_factor(player.nodes, depth) if searched else 0.0,
+            "principal_variation": self.principal_variation(depth) if searched else [col],
+        }
+        return record
+
+
+def branching_factor(nodes, depth):
+    """Solves b + b^2 + ... + b^depth = nodes - 1 for b by bisection."""
+    if depth <= 0 or nodes <= 1:
+        return 0.0
+    low, high = 0.0, float(nodes)
+    for _ in range(60):
+        b = (low + high) / 2
+        if sum(b ** d for d in range(1, depth + 1)) < nodes - 1:
+            low = b
+        else:
+            high = b
+    return low
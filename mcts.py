@@ -0,0 +1,188 @@
+import math
+import time
+import numpy as np
+from vecenv import VectorEnv
+
+# Monte Carlo tree search with UCT selection. Nodes live in parallel arrays indexed by
+# node number instead of per-node objects. Each batch selects batch_size leaves, using the
+# visit counted on the way down as a virtual loss so the leaves differ, and plays random
+# games from all of them at once in a VectorEnv. Values are stored from the point of view
+# of the piece that moved into the node: 1 per win, 0.5 per draw.
+
+
+class MCTS:
+    def __init__(self, rows=6, cols=7, exploration=1.4, batch_size=64, max_nodes=1 << 20, seed=None, connect=4):
+        self.rows = rows
+        self.cols = cols
+        self.connect = connect
+        self.exploration = exploration
+        self.batch_size = batch_size
+        # The tree stops growing at this many nodes; later playouts start at its leaves,
+        # and a full tree is dropped instead of reused for the next move
+        self.max_nodes = max_nodes
+        self.env = VectorEnv(batch_size, rows, cols, seed=seed, auto_reset=False, connect=connect)
+        self.rng = self.env.rng
+        self.playouts = 0
+        self.clear()
+
+    def clear(self):
+        capacity = 1024
+        self.children = np.full((capacity, self.cols), -1, dtype=np.int32)
+        self.mover = np.zeros(capacity, dtype=np.int8)  # piece that moved into the node
+        self.result = np.zeros(capacity, dtype=np.int8)  # winner_value after the move, 0 if the game goes on
+        self.expanded = np.zeros(capacity, dtype=bool)
+        self.visits = np.zeros(capacity, dtype=np.float64)
+        self.wins = np.zeros(capacity, dtype=np.float64)
+        self.count = 0
+        self.root = None
+        self.root_moves = None
+
+    def new_node(self, mover, result):
+        if self.count == len(self.mover):
+            capacity = max(min(2 * self.count, self.max_nodes + self.cols), self.count + 1)
+            self.children = np.concatenate([self.children,
+                                            np.full((capacity - len(self.children), self.cols), -1, dtype=np.int32)])
+            for name in ("mover", "result", "expanded", "visits", "wins"):
+                array = getattr(self, name)
+                setattr(self, name, np.concatenate([array, np.zeros(capacity - len(array), dtype=array.dtype)]))
+        node = self.count
+        self.children[node] = -1
+        self.mover[node] = mover
+        self.result[node] = result
+        self.expanded[node] = False
+        self.visits[node] = 0
+        self.wins[node] = 0
+        self.count += 1
+        return node
+
+    def set_root(self, board, piece):
+        """Moves the root to board, keeping the subtree of the moves played since the
+        last search when it is in the tree."""
+        moves = board.moves
+        node = -1
+        if self.root is not None and not self.full() and moves[:len(self.root_moves)] == self.root_moves:
+            node = self.root
+            for col in moves[len(self.root_moves):]:
+                node = self.children[node, col]
+                if node < 0:
+                    break
+        if node < 0 or self.mover[node] != 3 - piece:
+            self.clear()
+            node = self.new_node(3 - piece, 0)
+        self.root = node
+        self.root_moves = list(moves)
+
+    def full(self):
+        """True when there is no room left for the children of another node."""
+        return self.count + self.cols > self.max_nodes
+
+    def expand(self, node, board, piece):
+        for col in board.get_valid_locations():
+            board.play(col, piece)
+            if board.winning_move(piece):
+                result = piece
+            elif board.is_full():
+                result = 3
+            else:
+                result = 0
+            board.undo()
+            self.children[node, col] = self.new_node(piece, result)
+        self.expanded[node] = True
+
+    def select(self, board, piece):
+        """Walks from the root to a leaf, playing the moves on board and counting a visit
+        for every node on the way. Returns (path, piece to move at the leaf)."""
+        node = self.root
+        path = [node]
+        self.visits[node] += 1
+        while not self.result[node]:
+            if not self.expanded[node]:
+                if node != self.root and (self.visits[node] < 2 or self.full()):
+                    break  # a new leaf is played out once before it gets children, if there is room
+                self.expand(node, board, piece)
+            cols = np.flatnonzero(self.children[node] >= 0)
+            children = self.children[node, cols]
+            visits = self.visits[children]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                scores = self.wins[children] / visits + \
+                    self.exploration * np.sqrt(math.log(self.visits[node]) / visits)
+            scores[visits == 0] = np.inf
+            best = np.flatnonzero(scores == scores.max())
+            i = best[0] if len(best) == 1 else self.rng.choice(best)
+            node = children[i]
+            board.play(int(cols[i]), piece)
+            piece = 3 - piece
+            path.append(node)
+            self.visits[node] += 1
+        return path, piece
+
+    def run_batch(self, board, piece):
+        """Selects up to batch_size leaves, plays a random game from each and backs the
+        results up. Returns the number of playouts."""
+        paths = []
+        winners = []
+        lanes = []
+        for lane in range(self.batch_size):
+            path, leaf_piece = self.select(board, piece)
+            leaf = path[-1]
+            if self.result[leaf]:
+                winners.append(self.result[leaf])
+            else:
+                self.env.set_position([lane], board, leaf_piece)
+                lanes.append(lane)
+                winners.append(0)
+            paths.append(path)
+            for _ in range(len(path) - 1):
+                board.undo()
+
+        # Random playouts, all lanes one move at a time
+        results = np.zeros(self.batch_size, dtype=np.int8)
+        active = np.array(lanes, dtype=np.int64)
+        while len(active):
+            noise = self.rng.random((len(active), self.cols))
+            noise[~self.env.valid_mask()[active]] = -1.0
+            step_results = self.env.step(noise.argmax(axis=1), active)
+            finished = step_results != 0
+            results[active[finished]] = step_results[finished]
+            active = active[~finished]
+
+        nodes = []
+        rewards = []
+        for lane, path in enumerate(paths):
+            winner = winners[lane] or results[lane]
+            movers = self.mover[path]
+            nodes.extend(path)
+            rewards.append(np.where(movers == winner, 1.0, 0.5 if winner == 3 else 0.0))
+        np.add.at(self.wins, np.array(nodes), np.concatenate(rewards))
+        return len(paths)
+
+    def search(self, board, piece, playouts=None, time_limit=None, should_stop=None):
+        """Runs batches of playouts from board with piece to move until playouts have been
+        played, time_limit seconds have passed or should_stop() is true, and returns the
+        most visited move. Without playouts or time_limit only should_stop() ends it."""
+        self.set_root(board, piece)
+        board = board.copy()
+        deadline = time.perf_counter() + time_limit if time_limit is not None else None
+        self.playouts = 0
+        while True:
+            self.playouts += self.run_batch(board, piece)
+            if playouts is not None and self.playouts >= playouts:
+                break
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            if should_stop is not None and should_stop():
+                break
+        return self.best_move()
+
+    def best_move(self):
+        children = self.children[self.root]
+        visits = np.where(children >= 0, self.visits[children], -1)
+        return int(visits.argmax())
+
+    def root_values(self):
+        """Returns (col, visits, win rate) for every move at the root."""
+        values = []
+        for col, child in enumerate(self.children[self.root]):
+            if child >= 0 and self.visits[child]:
+                values.append((col, int(self.visits[child]), self.wins[child] / self.visits[child]))
+        return values
@@ -0,0 +1,63 @@
+# MoveOrdering sorts the moves of a search node without evaluating any child: the
+# transposition table move first, then the killer moves of the ply, then the rest by
+# history score, with columns closer to the center first on ties
+class MoveOrdering:
+    KILLERS_PER_PLY = 2
+
+    def __init__(self, rows=6, cols=7):
+        self.rows = rows
+        self.cols = cols
+        self.clear()
+
+    def clear(self):
+        """Forgets killers and history and resets the counters."""
+        # Lower rank is tried earlier: distance from the center, left before right
+        self.static_rank = [abs(2 * col - (self.cols - 1)) * 2 + (col > (self.cols - 1) / 2)
+                            for col in range(self.cols)]
+        self.killers = [[] for _ in range(self.rows * self.cols + 1)]  # per number of moves played
+        # Per piece and cell, the depth squared of every cutoff a move to it caused
+        self.history = [[0] * (self.rows * self.cols) for _ in range(3)]
+        self.nodes = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+
+    def new_search(self):
+        """Halves the history scores so the current search outweighs older ones."""
+        for scores in self.history:
+            scores[:] = [score >> 1 for score in scores]
+
+    def order(self, board, valid_locations, piece, tt_move=None):
+        """Returns valid_locations in the order they should be searched."""
+        self.nodes += 1
+        history = self.history[piece]
+        rows = self.rows
+        heights = board.heights
+        killers = self.killers[len(board.moves)]
+        rank = self.static_rank
+        ordered = sorted(valid_locations, key=lambda col: (-history[col * rows + heights[col]], rank[col]))
+        front = [col for col in killers if col in ordered and col != tt_move]
+        if tt_move is not None and tt_move in ordered:
+            front.insert(0, tt_move)
+        if front:
+            ordered = front + [col for col in ordered if col not in front]
+        return ordered
+
+    def cutoff(self, board, col, piece, depth, index):
+        """Records that col, the index-th move searched, caused a cutoff. Called with the
+        board in the node's position, before the move is played."""
+        self.cutoffs += 1
+        if index == 0:
+            self.first_move_cutoffs += 1
+        self.history[piece][col * self.rows + board.heights[col]] += depth * depth
+        killers = self.killers[len(board.moves)]
+        if col not in killers:
+            killers.insert(0, col)
+            del killers[self.KILLERS_PER_PLY:]
+
+    def first_move_cutoff_rate(self):
+        """Fraction of cutoffs caused by the first move searched."""
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    def cutoff_rate(self):
+        """Fraction of ordered nodes that ended in a cutoff."""
+        return self.cutoffs / self.nodes if self.nodes else 0.0
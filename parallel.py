@@ -0,0 +1,237 @@
+import argparse
+import itertools
+import math
+import multiprocessing
+import queue
+import random
+import sys
+import time
+from board import Board
+from symmetry import canonical_key, mirror_col
+from transposition import EXACT
+
+# Root-split search: the moves at the root are searched by a process pool, one task per
+# move. The first move is searched alone (young brothers wait) and every later task is
+# given the best lower bound known when it is sent out, so it can prune against it.
+#
+# Bounds only come from exact results: a move is searched with alpha set to the values of
+# the moves before it, and just below the values of the moves after it. The first move
+# with the highest value therefore always gets an exact result and is the one chosen,
+# which is the move the serial search picks with the same move order.
+#
+# Workers share a stop event with the search and get its deadline as a wall clock time;
+# a task stopped either way returns no value, and the search keeps the moves that
+# finished.
+
+
+def init_worker(stop_event):
+    search_root_move.stop_event = stop_event
+
+
+def search_root_move(task):
+    """Worker: searches the position after one root move and returns
+    (index, value, exact, nodes), with value None when the search was stopped."""
+    search_id, board, piece, depth, tt_size_mb, index, col, alpha, deadline = task
+    from player import minMaxPlayer, SearchTimeout
+    player = search_root_move.players.get(piece)
+    if player is None:
+        player = search_root_move.players[piece] = minMaxPlayer(piece, piece, None, tt_size_mb=tt_size_mb)
+        player.stop_event = search_root_move.stop_event
+    if search_root_move.search_id != search_id:
+        # Entries from other searches may be deeper than this one and change its values
+        player.tt.clear()
+        search_root_move.search_id = search_id
+    player.tt.new_search()
+    player.nodes = 0
+    player.deadline = None if deadline is None else time.perf_counter() + deadline - time.time()
+    player.search_node_limit = None
+    player.next_check = 0
+    board.play(col, piece)
+    try:
+        value = player.minimax(board, depth - 1, alpha, math.inf, False)[1]
+    except SearchTimeout:
+        return index, None, False, player.nodes
+    finally:
+        player.next_check = math.inf
+    return index, value, value > alpha, player.nodes
+
+
+search_root_move.players = {}
+search_root_move.search_id = None
+search_root_move.stop_event = None
+
+
+class ParallelSearch:
+    POLL_INTERVAL = 0.01  # seconds between two checks for stop() while waiting on workers
+
+    def __init__(self, workers=None, tt_size_mb=16):
+        self.workers = workers or multiprocessing.cpu_count()
+        self.tt_size_mb = tt_size_mb
+        self.pool = None
+        self.stop_event = None
+        self.search_ids = itertools.count()
+        self.nodes = 0
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def search(self, player, board, depth, time_limit=None):
+        """Searches board to the given depth for player and returns (col, score). When
+        time_limit seconds pass first, returns the best of the moves searched to the end;
+        raises SearchTimeout on player.stop() or when not even the first move finished."""
+        from player import SearchTimeout
+        if player.stop_requested:
+            raise SearchTimeout()
+        deadline = time.time() + time_limit if time_limit is not None else None
+        if self.pool is None:
+            self.stop_event = multiprocessing.Event()
+            self.pool = multiprocessing.Pool(self.workers, init_worker, (self.stop_event,))
+        # Every task of the previous search has returned, so none still sees the event
+        self.stop_event.clear()
+        search_id = (id(self), next(self.search_ids))
+        player.tt.new_search()
+        player.ordering.new_search()
+        # Same root order as the serial search
+        position_key, mirrored = canonical_key(board)
+        entry = player.tt.probe(position_key * 2 + True)
+        tt_move = None
+        if entry is not None:
+            tt_move = mirror_col(entry[3], board.get_col()) if mirrored else entry[3]
+        order = player.order_moves(board, board.get_valid_locations(), player.piece, tt_move)
+
+        results = {}  # index -> (value, exact)
+        unfinished = []  # indexes of the moves stopped before their search ended
+        done = queue.Queue()
+        self.nodes = 1
+
+        def root_alpha(index):
+            alpha = -math.inf
+            for other, (value, exact) in results.items():
+                if exact:
+                    alpha = max(alpha, value if other < index else math.nextafter(value, -math.inf))
+            return alpha
+
+        def send(index):
+            task = (search_id, board.copy(), player.piece, depth, self.tt_size_mb, index, order[index],
+                    root_alpha(index), deadline)
+            self.pool.apply_async(search_root_move, (task,), callback=done.put, error_callback=done.put)
+
+        def receive():
+            while True:
+                if player.stop_requested:
+                    self.stop_event.set()  # running tasks return at their next budget check
+                try:
+                    result = done.get(timeout=self.POLL_INTERVAL)
+                    break
+                except queue.Empty:
+                    pass
+            if isinstance(result, BaseException):
+                raise result
+            index, value, exact, nodes = result
+            if value is not None:
+                results[index] = (value, exact)
+            else:
+                unfinished.append(index)
+            self.nodes += nodes
+
+        def stopped():
+            return player.stop_requested or (deadline is not None and time.time() >= deadline)
+
+        send(0)
+        receive()
+        waiting = list(range(1, len(order)))
+        running = 0
+        while waiting or running:
+            if waiting and stopped():
+                unfinished.extend(waiting)
+                waiting = []  # wait for the running tasks only
+            while waiting and running < self.workers:
+                index = waiting.pop(0)
+                if any(exact and value >= 100000000000000 for value, exact in results.values()):
+                    continue  # a move wins already, and only an earlier move could be chosen over it
+                send(index)
+                running += 1
+            if running:
+                receive()
+                running -= 1
+
+        if player.stop_requested or not any(exact for value, exact in results.values()):
+            raise SearchTimeout()
+        best_index = min((index for index, (value, exact) in results.items() if exact),
+                         key=lambda index: (-results[index][0], index))
+        col, score = order[best_index], results[best_index][0]
+        if not unfinished:
+            player.tt.store(position_key * 2 + True, depth, EXACT, score,
+                            mirror_col(col, board.get_col()) if mirrored else col)
+        return col, score
+
+
+def random_positions(count, plies, seed=0, rows=6, cols=7):
+    """Returns count unfinished positions reached by plies random moves, with the piece
+    to move."""
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        board = Board(rows, cols)
+        piece = 1
+        for _ in range(plies):
+            board.play(rng.choice(board.get_valid_locations()), piece)
+            if board.winning_move(piece):
+                break
+            piece = 3 - piece
+        else:
+            positions.append((board, piece))
+    return positions
+
+
+def compare(positions, depth, workers=None, report=print):
+    """Searches every position serially and in parallel with fresh players and returns
+    (serial seconds, parallel seconds, number of positions where the moves differ)."""
+    from player import minMaxPlayer
+    parallel = ParallelSearch(workers)
+    serial_time = parallel_time = 0.0
+    mismatches = 0
+    try:
+        for number, (board, piece) in enumerate(positions, 1):
+            player = minMaxPlayer(piece, piece, None)
+            start = time.perf_counter()
+            serial_col, serial_score = player.search(board, depth)
+            serial_elapsed = time.perf_counter() - start
+            serial_nodes = player.nodes
+
+            player = minMaxPlayer(piece, piece, None)
+            start = time.perf_counter()
+            parallel_col, parallel_score = parallel.search(player, board, depth)
+            parallel_elapsed = time.perf_counter() - start
+
+            serial_time += serial_elapsed
+            parallel_time += parallel_elapsed
+            mismatches += serial_col != parallel_col
+            if report:
+                report(f"Position {number}: serial col {serial_col} ({serial_elapsed:.2f}s, {serial_nodes} nodes), "
+                       f"parallel col {parallel_col} ({parallel_elapsed:.2f}s, {parallel.nodes} nodes), "
+                       f"speedup {serial_elapsed / parallel_elapsed:.2f}x")
+    finally:
+        parallel.close()
+    return serial_time, parallel_time, mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the parallel root-split search with the serial search.")
+    parser.add_argument("--depth", type=int, default=6)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--positions", type=int, default=10)
+    parser.add_argument("--plies", type=int, default=6, help="random moves played to reach each position")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    positions = random_positions(args.positions, args.plies, args.seed)
+    serial_time, parallel_time, mismatches = compare(positions, args.depth, args.workers)
+    print(f"Serial {serial_time:.2f}s, parallel {parallel_time:.2f}s, speedup {serial_time / parallel_time:.2f}x, "
+          f"{mismatches} different moves")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,20 @@
 import numpy as np
-import pygame
 import sys
 import math
+import multiprocessing
 import random
-from board import Board
+import time
+from board import Board, position_key
+from book import OpeningBook
+from evaluation import WindowEvaluator
+from instrumentation import SearchRecorder
+from mcts import MCTS
+from ordering import MoveOrdering
+from parallel import ParallelSearch
+from qtable import QTable, MappedQTable
+from solver import Solver
+from symmetry import canonical_key, canonical_index, mirror_col, mirror_key
+from transposition import TranspositionTable, EXACT, LOWER, UPPER
 from abc import ABC, abstractmethod
 from threading import Timer
 
@@ -15,6 +26,8 @@ SQUARESIZE = 100
 CIRCLE_RADIUS = int(SQUARESIZE/2 - 5)
 # Abstract Player class
 class Player(ABC):
+    move_delay = 500  # milliseconds the GUI waits before a computer move is shown
+
     def __init__(self, player_number, piece, color):
         self.player_number = player_number
         self.piece = piece
@@ -28,6 +41,36 @@ class Player(ABC):
         return self.move_count
     def increment_move_count(self):
         self.move_count += 1
+
+    def close(self):
+        """Releases resources such as worker processes; the player may not be used after."""
+
+    def choose_move(self, board):
+        """Returns the column the player wants to play; used by headless games."""
+        raise NotImplementedError(f"{type(self).__name__} cannot choose moves on its own")
+
+    def move(self, board, col=None):
+        """Plays col (or the player's own choice) without any rendering or delay.
+        Returns True if the move wins the game."""
+        if col is None:
+            col = self.choose_move(board)
+        board.drop_piece(board.get_next_open_row(col), col, self.piece)
+        self.increment_move_count()
+        return board.winning_move(self.piece)
+
+    def wait(self):
+        # pygame is only imported by the GUI code paths
+        import pygame
+        pygame.time.wait(self.move_delay)
+
+    def announce_win(self, font, screen, not_over, end_game, name="PLAYER"):
+        print(f"{name} {self.player_number} WINS! with {self.move_count} moves!")
+        label = font.render(f"PLAYER {self.player_number} WINS!\n Takes {self.move_count} moves!", 1, self.color)
+        screen.blit(label, (40, 10))
+        not_over[0] = False
+        t = Timer(3.0, end_game)
+        t.start()
+
     @abstractmethod
     def make_move(self, board ,font,screen,not_over,end_game,col):
       pass
@@ -38,219 +81,397 @@ class HumanPlayer(Player):
 
     def make_move(self, board ,font,screen,not_over,end_game,col):
         if board.is_valid_location(col):
-            row = board.get_next_open_row(col)
-            board.drop_piece(row, col, self.piece)
-            self.increment_move_count()
-            if board.winning_move(self.piece):
-                print(f"PLAYER {self.player_number} WINS! with {self.move_count} moves!")
-                label = font.render(f"PLAYER {self.player_number} WINS!\n Takes {self.move_count} moves!", 1, self.color)
-                screen.blit(label, (40, 10))
-                not_over[0] = False
-                t = Timer(3.0, end_game)
-                t.start()
+            if self.move(board, col):
+                self.announce_win(font, screen, not_over, end_game)
+
+
+class SearchTimeout(Exception):
+    """Raised inside minimax when the time or node budget of a search runs out."""
 
 
 # AIPlayer class for AI moves using minmax strategy with alpha-beta pruning
 class minMaxPlayer(Player):
+    WIN_SCORE = 10000000000000  # scores at least this large are forced wins or losses
+    BUDGET_CHECK_INTERVAL = 16  # nodes between two clock reads
 
+    def __init__(self, player_number, piece, color, depth=5, time_limit=None, node_limit=None, tt_size_mb=16,
+                 book_path=None, solver_threshold=16, workers=None, sink=None):
+        super().__init__(player_number, piece, color)
+        # Opening book consulted before searching; the file is only opened on first use
+        self.book = OpeningBook(book_path) if book_path else None
+        # With at most this many empty cells left a Connect Four position is solved exactly instead
+        self.solver_threshold = solver_threshold
+        self.solver = None
+        self.last_solution = None  # (result, plies) of the last solved position
+        # Fixed depth search unless a per-move time (seconds) or node budget is given
+        self.depth = depth
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        # Kept for the whole game so each search reuses the work of the previous ones
+        self.tt = TranspositionTable(tt_size_mb)
+        # Fixed depth searches split the root moves over this many processes. Pool workers
+        # are daemonic and cannot start processes, so there the search stays serial.
+        self.parallel = None
+        if workers and workers > 1 and not multiprocessing.current_process().daemon:
+            self.parallel = ParallelSearch(workers, tt_size_mb)
+        self.evaluators = {}  # WindowEvaluator per board size and connect length
+        self.ordering = MoveOrdering()  # killers and history, kept between searches too
+        self.nodes = 0
+        self.next_check = math.inf
+        self.deadline = None
+        self.search_node_limit = None
+        self.stop_requested = False
+        self.stop_event = None  # a multiprocessing.Event that stops the search like stop()
+        self.last_score = None
+        self.last_depth = 0
+        self.last_source = None  # "book", "solver" or "search"
+        # With a sink (see instrumentation.py) statistics are recorded for every move
+        self.sink = sink
+
+    def close(self):
+        if self.parallel is not None:
+            self.parallel.close()
+            self.parallel = None
 
     def evaluate_window(self, window, piece):
         score = 0
         opp_piece = 1 if piece == 2 else 2
 
-        if window.count(piece) == 4:
+        length = len(window)
+
+        if window.count(piece) == length:
             score += 100
-        elif window.count(piece) == 3 and window.count(0) == 1:
+        elif window.count(piece) == length - 1 and window.count(0) == 1:
             score += 5
-        elif window.count(piece) == 2 and window.count(0) == 2:
+        elif window.count(piece) == length - 2 and window.count(0) == 2:
             score += 2
 
-        if window.count(opp_piece) == 3 and window.count(0) == 1:
+        if window.count(opp_piece) == length - 1 and window.count(0) == 1:
             score -= 4
 
         return score
 
     def score_position(self, board, piece):
-        score = 0
-        # Score center column
-        center_array = [int(i) for i in list(board.board[:, board.get_col()//2])]
-        center_count = center_array.count(piece)
-        score += center_count * 6
-
-        # Score Horizontal
-        for r in range(board.get_row()):
-            row_array = [int(i) for i in list(board.board[r, :])]
-            for c in range(board.get_col()-3):
-                window = row_array[c:c+4]
-                score += self.evaluate_window(window, piece)
-
-        # Score Vertical
-        for c in range(board.get_col()):
-            col_array = [int(i) for i in list(board.board[:, c])]
-            for r in range(board.get_row()-3):
-                window = col_array[r:r+4]
-                score += self.evaluate_window(window, piece)
-
-        # Score positive sloped diagonal
-        for r in range(board.get_row()-3):
-            for c in range(board.get_col()-3):
-                window = [board.board[r+i][c+i] for i in range(4)]
-                score += self.evaluate_window(window, piece)
-
-        # Score negative sloped diagonal
-        for r in range(board.get_row()-3):
-            for c in range(board.get_col()-3):
-                window = [board.board[r+3-i][c+i] for i in range(4)]
-                score += self.evaluate_window(window, piece)
-
-        return score
+        # Center column bonus plus evaluate_window summed over every window, read from
+        # the board's window counters by a per-board-size evaluator
+        size = (board.get_row(), board.get_col(), board.connect)
+        evaluator = self.evaluators.get(size)
+        if evaluator is None:
+            evaluator = WindowEvaluator(board.get_row(), board.get_col(), self.evaluate_window, board.connect)
+            self.evaluators[size] = evaluator
+        return evaluator.score(board, piece)
 
     def is_terminal_node(self, board):
         return (board.winning_move(1) or board.winning_move(2) or board.is_full())
 
+    def choose_move(self, board):
+        """Returns the column to play, using the player's depth or time/node budget."""
+        if self.sink is None:
+            return self.select_move(board)
+        with SearchRecorder(self, board) as recorder:
+            col = self.select_move(board)
+        self.sink.write(recorder.record(col))
+        return col
+
+    def select_move(self, board):
+        if self.book is not None:
+            entry = self.book.lookup(board, self.piece)
+            if entry is not None:
+                col, self.last_score = entry
+                self.last_depth = self.book.depth
+                self.last_source = "book"
+                self.nodes = 0
+                return col
+        empty = board.get_row() * board.get_col() - len(board.moves)
+        time_limit, node_limit = self.time_limit, self.node_limit
+        if self.solver_threshold and empty <= self.solver_threshold and board.connect == 4:
+            # Under a budget the solver gets half of it; if it runs out, the heuristic
+            # search below gets the rest. stop() makes that search raise at once.
+            start = time.perf_counter()
+            try:
+                return self.solve(board, None if time_limit is None else time_limit / 2,
+                                  None if node_limit is None else node_limit // 2)
+            except SearchTimeout:
+                pass
+            if time_limit is not None:
+                time_limit = max(time_limit - (time.perf_counter() - start), 0)
+            if node_limit is not None:
+                node_limit = max(node_limit - self.nodes, 0)
+        self.last_source = "search"
+        if time_limit is not None or node_limit is not None:
+            col, self.last_score = self.iterative_search(board, time_limit, node_limit)
+        elif self.parallel is not None and self.depth > 1:
+            col, self.last_score = self.parallel.search(self, board, self.depth)
+            self.nodes = self.parallel.nodes
+            self.last_depth = self.depth
+        else:
+            col, self.last_score = self.search(board, self.depth)
+            self.last_depth = self.depth
+        return col
+
+    def solve(self, board, time_limit=None, node_limit=None):
+        """Plays the endgame perfectly: solves the position and returns the best column.
+        last_solution is set to ("win" | "loss" | "draw", plies until the result).
+        Raises SearchTimeout when stopped or out of budget."""
+        if self.solver is None or (self.solver.rows, self.solver.cols) != (board.get_row(), board.get_col()):
+            self.solver = Solver(board.get_row(), board.get_col())
+        self.solver.nodes = 0
+        self.solver.next_check = 0
+        self.solver.check = self.check_solver_budget
+        self.deadline = time.perf_counter() + time_limit if time_limit is not None else None
+        self.search_node_limit = node_limit
+        try:
+            col, score, plies = self.solver.solve(board, self.piece)
+        finally:
+            self.solver.check = None
+            self.nodes = self.solver.nodes
+            self.next_check = math.inf
+        self.last_source = "solver"
+        # Map onto the search's scale, where forced wins and losses are beyond WIN_SCORE
+        if score > 0:
+            self.last_solution = ("win", plies)
+            self.last_score = 100000000000000 - plies
+        elif score < 0:
+            self.last_solution = ("loss", plies)
+            self.last_score = plies - 100000000000000
+        else:
+            self.last_solution = ("draw", plies)
+            self.last_score = 0
+        self.last_depth = plies
+        return col
+
+    def search(self, board, depth):
+        """Searches the position to the given depth and returns (col, score)."""
+        self.tt.new_search()
+        self.ordering.new_search()
+        self.nodes = 0
+        self.next_check = math.inf
+        if self.stop_requested:
+            raise SearchTimeout()
+        move_number = len(board.moves)
+        try:
+            return self.minimax(board, depth, -math.inf, math.inf, True)
+        except SearchTimeout:
+            self.take_back(board, move_number)
+            raise
+
+    def iterative_search(self, board, time_limit=None, node_limit=None, max_depth=None):
+        """Deepens one ply at a time until the budget runs out; returns (col, score)
+        of the last completed iteration."""
+        self.tt.new_search()
+        self.ordering.new_search()
+        self.nodes = 0
+        start = time.perf_counter()
+        self.deadline = start + time_limit if time_limit is not None else None
+        self.search_node_limit = node_limit
+        empty_cells = board.get_row() * board.get_col() - len(board.moves)
+        if max_depth is None:
+            max_depth = empty_cells
+        move_number = len(board.moves)
+        if self.stop_requested:
+            raise SearchTimeout()
+
+        # Depth 1 always completes so there is a move to return even on a tiny budget;
+        # only stop() interrupts it, and then there is no move to return
+        try:
+            col, score = self.minimax(board, 1, -math.inf, math.inf, True)
+        except SearchTimeout:
+            self.take_back(board, move_number)
+            self.next_check = math.inf
+            raise
+        self.last_depth = 1
+        self.next_check = self.nodes + self.BUDGET_CHECK_INTERVAL
+        for depth in range(2, min(max_depth, empty_cells) + 1):
+            if abs(score) >= self.WIN_SCORE:
+                break  # forced result found, deeper search cannot change it
+            try:
+                # The root entry stored by the previous iteration puts its best move first
+                col, score = self.minimax(board, depth, -math.inf, math.inf, True)
+            except SearchTimeout:
+                self.take_back(board, move_number)
+                break
+            self.last_depth = depth
+        self.next_check = math.inf
+        return col, score
+
+    def take_back(self, board, move_number):
+        """Undoes the moves an interrupted search left on board."""
+        while len(board.moves) > move_number:
+            board.undo()
+
+    def stop(self):
+        """Asks a search running on another thread to stop; it raises SearchTimeout at
+        its next node, or returns its last completed iteration under a budget. The
+        request holds until stop_requested is cleared again."""
+        self.stop_requested = True
+        self.next_check = 0
+
+    def check_budget(self):
+        if self.stop_requested or (self.stop_event is not None and self.stop_event.is_set()):
+            raise SearchTimeout()
+        if self.search_node_limit is not None and self.nodes >= self.search_node_limit:
+            raise SearchTimeout()
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SearchTimeout()
+        self.next_check = self.nodes + self.BUDGET_CHECK_INTERVAL
+        if self.search_node_limit is not None:
+            self.next_check = min(self.next_check, self.search_node_limit)
+
+    def check_solver_budget(self):
+        self.nodes = self.solver.nodes
+        self.check_budget()
+
+    def move_ordering(self, board):
+        """Returns the MoveOrdering, replaced by a new one when the board size changes."""
+        if self.ordering.rows != board.get_row() or self.ordering.cols != board.get_col():
+            self.ordering = MoveOrdering(board.get_row(), board.get_col())
+        return self.ordering
+
+    def order_moves(self, board, valid_locations, piece, tt_move):
+        return self.move_ordering(board).order(board, valid_locations, piece, tt_move)
+
     def minimax(self, board, depth, alpha, beta, maximizingPlayer):
-        # valid_locations = board.get_valid_locations()
-        # is_terminal = self.is_terminal_node(board)
-        # if depth == 0 or is_terminal:
-        #     if is_terminal:
-        #         if board.winning_move(self.piece):
-        #             return (None, 100000000000000)
-        #         elif board.winning_move(1 if self.piece == 2 else 2):
-        #             return (None, -10000000000000)
-        #         else:  # Game is over, no more valid moves
-        #             return (None, 0)
-        #     else:  # Depth is zero
-        #         return (None, self.score_position(board, self.piece))
-        # if maximizingPlayer:
-        #     value = -math.inf
-        #     best_col = random.choice(valid_locations)
-        #     for col in valid_locations:
-        #         row = board.get_next_open_row(col)
-        #         b_copy = Board(board.get_row(),board.get_col())
-        #         b_copy.board = np.copy(board.board)
-        #         b_copy.drop_piece(row, col, self.piece)
-        #         new_score = self.minimax(b_copy, depth-1, alpha, beta, False)[1]
-        #         if new_score > value:
-        #             value = new_score
-        #             best_col = col
-        #         alpha = max(alpha, value)
-        #         if alpha >= beta:
-        #             break
-        #     return best_col, value
-        # else:  # Minimizing player
-        #     value = math.inf
-        #     best_col = random.choice(valid_locations)
-        #     opp_piece = 1 if self.piece == 2 else 2
-        #     for col in valid_locations:
-        #         row = board.get_next_open_row(col)
-        #         b_copy = Board(board.get_row(),board.get_col())
-        #         b_copy.board = np.copy(board.board)
-        #         b_copy.drop_piece(row, col, opp_piece)
-        #         new_score = self.minimax(b_copy, depth-1, alpha, beta, True)[1]
-        #         if new_score < value:
-        #             value = new_score
-        #             best_col = col
-        #         beta = min(beta, value)
-        #         if alpha >= beta:
-        #             break
-        #     return best_col, value
-
-            valid_locations = board.get_valid_locations()
-            is_terminal = self.is_terminal_node(board)
-
-            # Check if the node is terminal or depth limit is reached
-            if depth == 0 or is_terminal:
-                if is_terminal:
-                    if board.winning_move(self.piece):
-                        return (None, 100000000000000)  # Win
-                    elif board.winning_move(1 if self.piece == 2 else 2):
-                        return (None, -10000000000000)  # Loss
-                    else:
-                        return (None, 0)  # Draw
+        # The search plays and takes back moves on the board it is given, so no
+        # node allocates a board; the board is back in its original state on return.
+        self.nodes += 1
+        if self.nodes >= self.next_check:
+            self.check_budget()
+        valid_locations = board.get_valid_locations()
+        is_terminal = self.is_terminal_node(board)
+
+        # Check if the node is terminal or depth limit is reached
+        if depth == 0 or is_terminal:
+            if is_terminal:
+                if board.winning_move(self.piece):
+                    return (None, 100000000000000)  # Win
+                elif board.winning_move(1 if self.piece == 2 else 2):
+                    return (None, -10000000000000)  # Loss
+                else:
+                    return (None, 0)  # Draw
+            else:
+                return (None, self.score_position(board, self.piece))
+
+        # Mirror images share an entry; the same cells can be reached with either side
+        # to move, so the key includes it
+        position_key, mirrored = canonical_key(board)
+        key = position_key * 2 + maximizingPlayer
+        tt_move = None
+        entry = self.tt.probe(key)
+        if entry is not None:
+            tt_depth, flag, tt_value, tt_move = entry
+            if mirrored:
+                tt_move = mirror_col(tt_move, board.get_col())
+            if tt_depth >= depth:
+                if flag == EXACT:
+                    return tt_move, tt_value
+                elif flag == LOWER:
+                    alpha = max(alpha, tt_value)
                 else:
-                    return (None, self.score_position(board, self.piece))
-
-            if maximizingPlayer:
-                value = -math.inf
-                best_col = random.choice(valid_locations)
-                for col in sorted(valid_locations, key=lambda x: self.heuristic(board, x, self.piece),
-                                  reverse=True):  # Sort moves
-                    row = board.get_next_open_row(col)
-                    b_copy = Board(board.get_row(), board.get_col())
-                    b_copy.board = np.copy(board.board)
-                    b_copy.drop_piece(row, col, self.piece)
-
-                    new_score = self.minimax(b_copy, depth - 1, alpha, beta, False)[1]
-                    if new_score > value:
-                        value = new_score
-                        best_col = col
-                    alpha = max(alpha, value)
-                    if alpha >= beta:
-                        break  # Alpha-beta pruning
-                return best_col, value
-            else:  # Minimizing player
-                value = math.inf
-                best_col = random.choice(valid_locations)
-                opp_piece = 1 if self.piece == 2 else 2
-                for col in sorted(valid_locations, key=lambda x: self.heuristic(board, x, opp_piece)):  # Sort moves
-                    row = board.get_next_open_row(col)
-                    b_copy = Board(board.get_row(), board.get_col())
-                    b_copy.board = np.copy(board.board)
-                    b_copy.drop_piece(row, col, opp_piece)
-
-                    new_score = self.minimax(b_copy, depth - 1, alpha, beta, True)[1]
-                    if new_score < value:
-                        value = new_score
-                        best_col = col
-                    beta = min(beta, value)
-                    if alpha >= beta:
-                        break  # Alpha-beta pruning
-                return best_col, value
-
-    def heuristic(self, board, col, piece):
-        # Copy the board and simulate the move by dropping a piece in the column
-        row = board.get_next_open_row(col)
-        board_copy = Board(board.get_row(), board.get_col())
-        board_copy.board = np.copy(board.board)
-        board_copy.drop_piece(row, col, piece)
-
-        # Evaluate the board after the move is made
-        return self.score_position(board_copy, piece)
+                    beta = min(beta, tt_value)
+                if alpha >= beta:
+                    return tt_move, tt_value
+        window_alpha, window_beta = alpha, beta
+
+        if maximizingPlayer:
+            value = -math.inf
+            best_col = random.choice(valid_locations)
+            for i, col in enumerate(self.order_moves(board, valid_locations, self.piece, tt_move)):
+                board.play(col, self.piece)
+                new_score = self.minimax(board, depth - 1, alpha, beta, False)[1]
+                board.undo()
+                if new_score > value:
+                    value = new_score
+                    best_col = col
+                alpha = max(alpha, value)
+                if alpha >= beta:
+                    self.ordering.cutoff(board, col, self.piece, depth, i)
+                    break  # Alpha-beta pruning
+        else:  # Minimizing player
+            value = math.inf
+            best_col = random.choice(valid_locations)
+            opp_piece = 1 if self.piece == 2 else 2
+            for i, col in enumerate(self.order_moves(board, valid_locations, opp_piece, tt_move)):
+                board.play(col, opp_piece)
+                new_score = self.minimax(board, depth - 1, alpha, beta, True)[1]
+                board.undo()
+                if new_score < value:
+                    value = new_score
+                    best_col = col
+                beta = min(beta, value)
+                if alpha >= beta:
+                    self.ordering.cutoff(board, col, opp_piece, depth, i)
+                    break  # Alpha-beta pruning
+
+        # Store the result with its bound type relative to the window it was searched with
+        if value <= window_alpha:
+            flag = UPPER
+        elif value >= window_beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.tt.store(key, depth, flag, value, mirror_col(best_col, board.get_col()) if mirrored else best_col)
+        return best_col, value
 
     def make_move(self, board ,font,screen,not_over,end_game,col):
-
-            pygame.time.wait(500)
-            row = board.get_next_open_row(col)
-            board.drop_piece(row, col, self.piece)
-            self.increment_move_count()
-            if board.winning_move(self.piece):
-                print(f"PLAYER {self.player_number } WINS! with {self.move_count} moves!")
-                label = font.render(f"PLAYER {self.player_number} WINS!\n Takes {self.move_count} moves!", 1, self.color)
-                screen.blit(label, (40, 10))
-                not_over[0] = False
-                t = Timer(3.0, end_game)
-                t.start()
+            # The GUI searches in the background and holds the move back for move_delay
+            # itself, so no wait() here
+            if self.move(board, col):
+                self.announce_win(font, screen, not_over, end_game)
 
 
 class QLearningPlayer(Player):
     reward = {'win': 1, 'lose': 0, 'draw': 0.5}
-    def __init__(self, player_number, piece, color):
+    def __init__(self, player_number, piece, color, table_path=None, rows=6, cols=7):
         super().__init__(player_number, piece, color)
-        self.stateAction_values = {}  # Stores state-action values for Q-learning
+        # The board size the table is for, checked here so indexing a board needn't be
+        self.check_board_size(rows, cols)
+        self.rows = rows
+        self.cols = cols
         self.state_action_history = []  # To store (state, action) pairs for the current game
         self.alpha = 0.9   # Learning rate
         self.gamma = 0.95  # Discount factor
         self.q_init = 0.6  # Initial Q-table value
+        self.stateAction_values = QTable(self.q_init)  # Stores state-action values for Q-learning
+        if table_path is not None:
+            self.load(table_path)
+
+    def save(self, path):
+        """Saves the Q-table to a file that other processes can load."""
+        self.stateAction_values.save(path)
+
+    def load(self, path):
+        """Uses a saved Q-table, memory-mapped read-only so processes share one copy.
+        States learned afterwards are kept in memory on top of it."""
+        table = MappedQTable(path)
+        if table.cols != self.cols:
+            raise ValueError(f"Q-table file has {table.cols} columns, not {self.cols}")
+        self.stateAction_values = QTable(base=table)
+        self.q_init = self.stateAction_values.q_init
+
+    @staticmethod
+    def check_board_size(rows, cols):
+        """Raises ValueError for boards whose position keys do not fit the Q-table's int64 keys."""
+        if (rows + 1) * cols > 62:
+            raise ValueError(f"Q-learning players need position keys of at most 62 bits; "
+                             f"a {rows}x{cols} board needs {(rows + 1) * cols}")
 
     def index_board(self, board):
-        """Returns a string representation of the board to use as a unique index."""
-        return ''.join(map(str, board.board.flatten()))
-
-    def get_q_values(self, board_index, cols):
-        """Returns the Q-values for the current board state, initializing if necessary."""
-        if board_index not in self.stateAction_values:
-            self.stateAction_values[board_index] = np.ones(cols) * self.q_init
-        return self.stateAction_values[board_index]
+        """Returns the board's canonical index: mirror images share one Q-table entry."""
+        return canonical_index(*canonical_key(board))
+
+    def index_array(self, board_array):
+        """Same index as index_board, for a bare (rows, cols) array such as one lane of a VectorEnv."""
+        key = position_key(board_array)
+        mirrored = mirror_key(key, *board_array.shape)
+        return canonical_index(min(key, mirrored), mirrored < key)
+
+    def get_q_values(self, board_index, cols, write=False):
+        """Returns the Q-values for the current board state, initializing if necessary.
+        The values are a view into the Q-table, valid until the next new state is added;
+        for mirrored states the view is reversed so it is indexed by this board's columns.
+        write=True marks the state as changed for the next checkpoint."""
+        q_values = self.stateAction_values.get(board_index >> 1, cols, write)
+        return q_values[::-1] if board_index & 1 else q_values
 
     def is_valid_move(self, col, board):
         """Checks if a move in the given column is valid."""
@@ -270,19 +491,24 @@ class QLearningPlayer(Player):
         self.state_action_history.append((board_index, best_move))
         return best_move
 
-    def update_q_values(self, result, board):
-        """Updates the Q-values based on the result of the game."""
+    def result_reward(self, result):
+        """Maps a winner_value() result to this player's reward."""
         if result == 3:  # Draw
-            reward = self.reward['draw']
+            return self.reward['draw']
         elif result == self.player_number:
-            reward = self.reward['win']
-        else:
-            reward = self.reward['lose']
+            return self.reward['win']
+        return self.reward['lose']
+
+    def update_q_values(self, result, board):
+        """Updates the Q-values based on the result of the game."""
+        self.learn(self.state_action_history, self.result_reward(result), board.get_col())
 
+    def learn(self, history, reward, cols):
+        """Updates the Q-values of a list of (board_index, action) pairs ending with reward."""
         # Update Q-values in reverse order of the move history
         next_max = None  # Keep track of the next max Q-value for updating
-        for board_index, action in reversed(self.state_action_history):
-            q_values = self.get_q_values(board_index, board.get_col())
+        for board_index, action in reversed(history):
+            q_values = self.get_q_values(board_index, cols, write=True)
             if next_max is None:
                 q_values[action] = reward
             else:
@@ -297,29 +523,31 @@ class QLearningPlayer(Player):
     def reset_moveCount(self):
         self.move_count = 0
 
-    def make_move(self, board, font, screen, not_over, end_game, col=None):
-        """Executes a move for the Q-learning player."""
-        pygame.time.wait(500)
-        best_move = self.find_best_move(board)
-        row = board.get_next_open_row(best_move)
-        board.drop_piece(row, best_move, self.piece)
-        self.increment_move_count()
+    def choose_move(self, board):
+        return self.find_best_move(board)
 
-        if board.winning_move(self.piece):
-            print(f"PLAYER Q-learning {self.player_number} WINS! with {self.move_count} moves!")
-            label = font.render(f"PLAYER {self.player_number} WINS!\n Takes {self.move_count} moves!", 1, self.color)
-            screen.blit(label, (40, 10))
-            not_over[0] = False
-            t = Timer(3.0, end_game)
-            t.start()
+    def move(self, board, col=None):
+        """Plays the best move from the Q-table and updates the Q-values."""
+        won = super().move(board, col)
 
         # Update Q-values based on the game result
         winner = board.winner_value()
         self.update_q_values(winner, board)
         self.reset()
+        return won
 
-    def train(self, train_iterations, board_rows, board_cols, player1, player2):
-        """Trains the Q-learning player against itself."""
+    def make_move(self, board, font, screen, not_over, end_game, col=None):
+        """Executes a move for the Q-learning player."""
+        self.wait()
+        if self.move(board):
+            self.announce_win(font, screen, not_over, end_game, "PLAYER Q-learning")
+
+    def train(self, train_iterations, board_rows, board_cols, player1, player2,
+              checkpoint_paths=None, checkpoint_every=1000):
+        """Trains the Q-learning player against itself. With checkpoint_paths (one file per
+        player) the states changed since the last checkpoint are appended to the files
+        every checkpoint_every iterations and at the end."""
+        self.check_board_size(board_rows, board_cols)
         for iteration in range(train_iterations):
             board = Board(board_rows, board_cols)
             player1.reset()
@@ -336,23 +564,59 @@ class QLearningPlayer(Player):
             player1.update_q_values(result, board)
             player2.update_q_values(result, board)
 
+            if checkpoint_paths and ((iteration + 1) % checkpoint_every == 0 or iteration + 1 == train_iterations):
+                player1.stateAction_values.checkpoint(checkpoint_paths[0])
+                player2.stateAction_values.checkpoint(checkpoint_paths[1])
+
         return player1, player2
 
 
+# Monte Carlo tree search player: plays random games from the position and picks the move
+# whose subtree was visited most. Playing strength grows with the playout or time budget.
+class MCTSPlayer(Player):
+    def __init__(self, player_number, piece, color, playouts=2000, time_limit=None, batch_size=64,
+                 exploration=1.4, seed=None, max_nodes=1 << 20):
+        super().__init__(player_number, piece, color)
+        # Stops at playouts or after time_limit seconds, whichever comes first; pass
+        # playouts=None for a time budget only
+        if playouts is None and time_limit is None:
+            raise ValueError("MCTSPlayer needs playouts or a time_limit")
+        self.playouts = playouts
+        self.time_limit = time_limit
+        self.batch_size = batch_size
+        self.exploration = exploration
+        self.max_nodes = max_nodes  # size limit of the search tree
+        # Without a seed one is drawn from the global random module, so seeding it (as
+        # tournament.py does for every game) makes the games reproducible
+        self.seed = seed if seed is not None else random.getrandbits(64)
+        self.tree = None  # kept between moves, so the subtree of the game's moves is reused
+        self.stop_requested = False
+
+    def choose_move(self, board):
+        size = (board.get_row(), board.get_col(), board.connect)
+        if self.tree is None or (self.tree.rows, self.tree.cols, self.tree.connect) != size:
+            self.tree = MCTS(board.get_row(), board.get_col(), self.exploration, self.batch_size, self.max_nodes,
+                             self.seed, board.connect)
+        return self.tree.search(board, self.piece, self.playouts, self.time_limit, lambda: self.stop_requested)
+
+    def stop(self):
+        """Asks a search running on another thread to return its best move so far."""
+        self.stop_requested = True
+
+    def make_move(self, board, font, screen, not_over, end_game, col):
+        if self.move(board, col):
+            self.announce_win(font, screen, not_over, end_game)
+
+
 # random player
 class RandomPlayer(Player):
+    def choose_move(self, board):
+        return random.choice(board.get_valid_locations())  # Randomly select a valid column
+
     def make_move(self, board, font, screen, not_over, end_game, col=0):
         valid_locations = board.get_valid_locations()
         if valid_locations:
-            col = random.choice(valid_locations)  # Randomly select a valid column
-            pygame.time.wait(500)
-            row = board.get_next_open_row(col)
-            board.drop_piece(row, col, self.piece)
-            self.increment_move_count()
-            if board.winning_move(self.piece):
-                print(f"PLAYER {self.player_number} WINS! with {self.move_count} moves! ")
-                label = font.render(f"PLAYER {self.player_number} WINS!\n Takes {self.move_count} moves!", 1, self.color)
-                screen.blit(label, (40, 10))
-                not_over[0] = False
-                t = Timer(3.0, end_game)
-                t.start()
\ No newline at end of file
+            col = self.choose_move(board)
+            self.wait()
+            if self.move(board, col):
+                self.announce_win(font, screen, not_over, end_game)
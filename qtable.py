@@ -0,0 +1,313 @@
+import os
+import struct
+import numpy as np
+
+HASH_MULTIPLIER = 0x9E3779B97F4A7C15  # Fibonacci hashing, same constant as the transposition table
+MASK64 = (1 << 64) - 1
+MAX_LOAD = 0.7  # the index doubles once it is this full
+
+# On-disk format: a file header followed by segments, each a segment header, the
+# segment's keys as sorted int64 and its rows as float32. Later segments override
+# earlier ones, so checkpoints append a segment instead of rewriting the file.
+FILE_MAGIC = b"C4QTABLE"
+FILE_VERSION = 2  # version 2: keys are mirror-canonical
+FILE_HEADER = struct.Struct("<8sIIdI36x")  # magic, version, cols, q_init, segment count
+SEGMENT_MAGIC = b"QSEG"
+SEGMENT_HEADER = struct.Struct("<4s4xQ16x")  # magic, number of states
+
+
+# QTable stores Q-values keyed by integer position keys (the canonical key from
+# symmetry.canonical_key, so a position and its mirror image share a row). An
+# open-addressing index of int64 keys and int32 row numbers points into one contiguous,
+# growable float32 array with a row of action values per state.
+class QTable:
+    def __init__(self, q_init=0.6, cols=None, capacity=1024, base=None):
+        self.q_init = q_init
+        self.cols = cols
+        # Read-only table (usually a MappedQTable) consulted for states not stored here;
+        # a state is copied out of it the first time it is requested for writing
+        self.base = base
+        if base is not None:
+            self.q_init = base.q_init
+            self.cols = base.cols
+        self.count = 0
+        self.values = None
+        self.dirty = np.zeros(0, dtype=bool)  # rows changed since the last checkpoint
+        self.reserve(capacity)
+        self.allocate_index(max(16, capacity * 2))
+
+    def reserve(self, capacity):
+        """Makes room for capacity states in the value array."""
+        if self.cols is None or (self.values is not None and capacity <= len(self.values)):
+            return
+        values = np.empty((capacity, self.cols), dtype=np.float32)
+        dirty = np.zeros(capacity, dtype=bool)
+        if self.values is not None:
+            values[:self.count] = self.values[:self.count]
+            dirty[:self.count] = self.dirty[:self.count]
+        self.values = values
+        self.dirty = dirty
+
+    def allocate_index(self, slots):
+        slots = 1 << max(4, (slots - 1).bit_length())
+        self.shift = 64 - (slots.bit_length() - 1)
+        self.slot_keys = np.zeros(slots, dtype=np.int64)  # 0 marks an empty slot
+        self.slot_rows = np.zeros(slots, dtype=np.int32)
+
+    def slot(self, key):
+        return ((int(key) * HASH_MULTIPLIER) & MASK64) >> self.shift
+
+    def slots(self, keys):
+        """Vectorized slot() for an array of keys."""
+        with np.errstate(over="ignore"):
+            hashed = keys.astype(np.uint64) * np.uint64(HASH_MULTIPLIER)
+        return (hashed >> np.uint64(self.shift)).astype(np.int64)
+
+    def find(self, key):
+        """Returns the row of key, or -1 if the state is not stored."""
+        mask = len(self.slot_keys) - 1
+        i = self.slot(key)
+        slot_keys = self.slot_keys
+        while True:
+            stored = slot_keys[i]
+            if stored == key:
+                return int(self.slot_rows[i])
+            if stored == 0:
+                return -1
+            i = (i + 1) & mask
+
+    def insert(self, key, values=None):
+        """Adds a state initialized to q_init (or values) and returns its row."""
+        if self.cols is None:
+            raise ValueError("QTable needs the number of columns before states can be added")
+        if self.count + 1 > MAX_LOAD * len(self.slot_keys):
+            self.rebuild_index(len(self.slot_keys) * 2)
+        if self.count == len(self.values):
+            self.reserve(len(self.values) * 2)
+        row = self.count
+        self.values[row] = self.q_init if values is None else values
+        mask = len(self.slot_keys) - 1
+        i = self.slot(key)
+        while self.slot_keys[i] != 0:
+            i = (i + 1) & mask
+        self.slot_keys[i] = key
+        self.slot_rows[i] = row
+        self.count += 1
+        return row
+
+    def get(self, key, cols=None, write=False):
+        """Returns the Q-values of key, adding the state if needed. The row is a view into
+        the value array: writes update the table, and it stays valid until the next insert.
+        Pass write=True when the row will be changed, so the next checkpoint includes it."""
+        if self.cols is None:
+            self.cols = cols
+            self.reserve(1024)
+        row = self.find(key)
+        if row < 0:
+            row = self.insert(key, None if self.base is None else self.base.lookup(key))
+        if write:
+            self.dirty[row] = True
+        return self.values[row]
+
+    def lookup(self, key):
+        """Returns the Q-values of key without adding it, or None."""
+        row = self.find(key)
+        if row >= 0:
+            return self.values[row]
+        return None if self.base is None else self.base.lookup(key)
+
+    def find_rows(self, keys):
+        """Vectorized find(): returns the row of every key, -1 where missing."""
+        keys = np.asarray(keys, dtype=np.int64)
+        mask = len(self.slot_keys) - 1
+        positions = self.slots(keys)
+        rows = np.full(len(keys), -1, dtype=np.int64)
+        pending = np.arange(len(keys))
+        while len(pending):
+            stored = self.slot_keys[positions[pending]]
+            found = stored == keys[pending]
+            rows[pending[found]] = self.slot_rows[positions[pending[found]]]
+            # Keep probing while the slot holds some other key
+            pending = pending[~found & (stored != 0)]
+            positions[pending] = (positions[pending] + 1) & mask
+        return rows
+
+    def get_rows(self, keys, cols=None):
+        """Vectorized get(..., write=True): returns the rows of keys, adding missing states."""
+        if self.cols is None:
+            self.cols = cols
+            self.reserve(1024)
+        rows = self.find_rows(keys)
+        for i in np.flatnonzero(rows < 0):
+            # The same new key can appear twice in one batch
+            row = self.find(int(keys[i]))
+            if row < 0:
+                row = self.insert(int(keys[i]), None if self.base is None else self.base.lookup(keys[i]))
+            rows[i] = row
+        self.dirty[rows] = True
+        return rows
+
+    def rebuild_index(self, slots):
+        keys = self.keys()
+        self.allocate_index(slots)
+        mask = len(self.slot_keys) - 1
+        positions = self.slots(keys)
+        pending = np.arange(len(keys))
+        while len(pending):
+            free = self.slot_keys[positions[pending]] == 0
+            # Among keys probing the same free slot only the first one claims it
+            _, first = np.unique(positions[pending[free]], return_index=True)
+            claimed = pending[free][first]
+            self.slot_keys[positions[claimed]] = keys[claimed]
+            self.slot_rows[positions[claimed]] = claimed  # keys() is in row order
+            claimed_mask = np.zeros(len(keys), dtype=bool)
+            claimed_mask[claimed] = True
+            pending = pending[~claimed_mask[pending]]
+            positions[pending] = (positions[pending] + 1) & mask
+
+    def keys(self):
+        """Returns the stored keys in row order."""
+        used = np.flatnonzero(self.slot_keys)
+        return self.slot_keys[used][np.argsort(self.slot_rows[used])]
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, key):
+        return self.find(key) >= 0 or (self.base is not None and key in self.base)
+
+    def nbytes(self):
+        """Memory used by the index and the value rows in use."""
+        values = self.count * self.cols * 4 if self.cols else 0
+        return self.slot_keys.nbytes + self.slot_rows.nbytes + values
+
+    def save(self, path):
+        """Writes the table, merged with its base table, to a new single-segment file."""
+        keys = self.keys()
+        values = self.values[:self.count] if self.count else np.zeros((0, self.cols), dtype=np.float32)
+        if self.base is not None:
+            base_keys, base_values = self.base.merged()
+            keep = ~np.isin(base_keys, keys)
+            keys = np.concatenate([base_keys[keep], keys])
+            values = np.concatenate([base_values[keep], values])
+        temporary = f"{path}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, self.cols, self.q_init, 1))
+            write_segment(f, keys, values)
+        os.replace(temporary, path)
+
+    def checkpoint(self, path):
+        """Appends the states changed since the last checkpoint to path as a new segment,
+        creating the file if needed. Returns the number of states written."""
+        rows = np.flatnonzero(self.dirty[:self.count])
+        if not os.path.exists(path):
+            with open(path, "wb") as f:
+                f.write(FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, self.cols, self.q_init, 0))
+        if len(rows):
+            all_keys = self.keys()
+            append_segment(path, all_keys[rows], self.values[rows], self.cols)
+            self.dirty[rows] = False
+        return len(rows)
+
+
+def write_segment(f, keys, values):
+    order = np.argsort(keys, kind="stable")
+    f.write(SEGMENT_HEADER.pack(SEGMENT_MAGIC, len(keys)))
+    f.write(np.ascontiguousarray(keys[order], dtype="<i8").tobytes())
+    f.write(np.ascontiguousarray(values[order], dtype="<f4").tobytes())
+    f.write(b"\0" * (-f.tell() % 8))  # keep the next segment's keys 8-byte aligned
+
+
+def read_header(f):
+    magic, version, cols, q_init, segments = FILE_HEADER.unpack(f.read(FILE_HEADER.size))
+    if magic != FILE_MAGIC:
+        raise ValueError("Not a Q-table file")
+    if version != FILE_VERSION:
+        raise ValueError(f"Unsupported Q-table file version {version}")
+    return cols, q_init, segments
+
+
+def append_segment(path, keys, values, cols):
+    """Appends keys and their rows to a Q-table file without rewriting it."""
+    with open(path, "r+b") as f:
+        file_cols, q_init, segments = read_header(f)
+        if file_cols != cols:
+            raise ValueError(f"Q-table file has {file_cols} columns, not {cols}")
+        f.seek(0, os.SEEK_END)
+        write_segment(f, keys, values)
+        f.flush()
+        # The segment count is updated last so readers never see a partial segment
+        f.seek(0)
+        f.write(FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, cols, q_init, segments + 1))
+
+
+def merge_files(path, *sources):
+    """Appends the states of other Q-table files to path, one segment per source."""
+    for source in sources:
+        table = MappedQTable(source)
+        keys, values = table.merged()
+        append_segment(path, keys, np.asarray(values), table.cols)
+
+
+# MappedQTable opens a saved Q-table read-only through memory maps, so any number of
+# processes can share one trained table without loading private copies
+class MappedQTable:
+    def __init__(self, path):
+        self.path = path
+        self.segments = []
+        with open(path, "rb") as f:
+            self.cols, self.q_init, segment_count = read_header(f)
+            offset = FILE_HEADER.size
+            for _ in range(segment_count):
+                f.seek(offset)
+                magic, count = SEGMENT_HEADER.unpack(f.read(SEGMENT_HEADER.size))
+                if magic != SEGMENT_MAGIC:
+                    raise ValueError(f"Corrupt Q-table segment at offset {offset}")
+                offset += SEGMENT_HEADER.size
+                if count:
+                    keys = np.memmap(path, dtype="<i8", mode="r", offset=offset, shape=(count,))
+                    values = np.memmap(path, dtype="<f4", mode="r", offset=offset + count * 8,
+                                       shape=(count, self.cols))
+                    self.segments.append((keys, values))
+                offset += count * (8 + 4 * self.cols)
+                offset += -offset % 8
+        # Newest segment first, so the latest checkpoint of a state wins
+        self.segments.reverse()
+
+    def lookup(self, key):
+        """Returns the read-only Q-values of key, or None."""
+        for keys, values in self.segments:
+            i = np.searchsorted(keys, key)
+            if i < len(keys) and keys[i] == key:
+                return values[i]
+        return None
+
+    def lookup_many(self, keys):
+        """Returns a (len(keys), cols) array of Q-values, q_init for missing states."""
+        keys = np.asarray(keys, dtype=np.int64)
+        result = np.full((len(keys), self.cols), self.q_init, dtype=np.float32)
+        missing = np.arange(len(keys))
+        for segment_keys, segment_values in self.segments:
+            if not len(missing):
+                break
+            i = np.minimum(np.searchsorted(segment_keys, keys[missing]), len(segment_keys) - 1)
+            found = segment_keys[i] == keys[missing]
+            result[missing[found]] = segment_values[i[found]]
+            missing = missing[~found]
+        return result
+
+    def merged(self):
+        """Returns (keys, values) of every state, newest version only."""
+        if not self.segments:
+            return np.zeros(0, dtype=np.int64), np.zeros((0, self.cols), dtype=np.float32)
+        keys = np.concatenate([segment_keys for segment_keys, _ in self.segments])
+        values = np.concatenate([segment_values for _, segment_values in self.segments])
+        # Segments are newest first, so the first occurrence of each key is the latest
+        keys, first = np.unique(keys, return_index=True)
+        return keys, values[first]
+
+    def __contains__(self, key):
+        return self.lookup(key) is not None
+
+    def __len__(self):
+        return len(self.merged()[0])
@@ -0,0 +1,169 @@
+import argparse
+import os
+import struct
+import sys
+import numpy as np
+from board import Board
+
+# Game record log: a file header, then one record per game appended as it finishes.
+# A record is a fixed header, the two player names (length-prefixed UTF-8), the moves
+# packed two per byte (one per byte for boards wider than 16 columns) and one float32
+# think time in seconds per move. Results use the Board.winner_value convention
+# (1 or 2 for the winning piece, 3 for a draw).
+RECORD_MAGIC = b"C4GAMES\0"
+RECORD_VERSION = 2
+FILE_HEADER = struct.Struct("<8sI4x")  # magic, version
+# record size, rows, cols, connect length, result, first piece, moves, think times, seed
+# (-1 if unknown)
+RECORD_HEADER = struct.Struct("<IBBBBBHHq")
+
+
+def pack_moves(moves, cols):
+    moves = np.asarray(moves, dtype=np.uint8)
+    if cols > 16:
+        return moves.tobytes()
+    if len(moves) % 2:
+        moves = np.append(moves, 0)
+    return (moves[0::2] | (moves[1::2] << 4)).astype(np.uint8).tobytes()
+
+
+def unpack_moves(data, count, cols):
+    packed = np.frombuffer(data, dtype=np.uint8)
+    if cols > 16:
+        return packed[:count].tolist()
+    moves = np.empty(len(packed) * 2, dtype=np.uint8)
+    moves[0::2] = packed & 0x0F
+    moves[1::2] = packed >> 4
+    return moves[:count].tolist()
+
+
+# GameRecord is one game read back from a log
+class GameRecord:
+    def __init__(self, offset, rows, cols, connect, result, first_piece, moves, players, think_times, seed):
+        self.offset = offset  # position of the record in the file, for read_record
+        self.rows = rows
+        self.cols = cols
+        self.connect = connect
+        self.result = result
+        self.first_piece = first_piece
+        self.moves = moves
+        self.players = players  # names of the players of piece 1 and piece 2
+        self.think_times = think_times
+        self.seed = seed
+
+    def replay(self, plies=None):
+        """Returns a Board with the first plies moves played (all by default) and the
+        piece to move next."""
+        board = Board(self.rows, self.cols, self.connect)
+        piece = self.first_piece
+        for col in self.moves[:plies]:
+            board.play(col, piece)
+            piece = 3 - piece
+        return board, piece
+
+    def __repr__(self):
+        return f"GameRecord(result={self.result}, moves={len(self.moves)}, players={self.players})"
+
+
+class GameRecordWriter:
+    def __init__(self, path):
+        self.file = open(path, "ab")
+        if self.file.tell() == 0:
+            self.file.write(FILE_HEADER.pack(RECORD_MAGIC, RECORD_VERSION))
+        else:
+            # Appending to a log of another format would corrupt it
+            with open(path, "rb") as f:
+                check_header(f.read(FILE_HEADER.size))
+
+    def write(self, moves, result, first_piece, players, think_times=(), seed=-1, rows=6, cols=7, connect=4):
+        """Appends one game. think_times may be empty, or have one entry per move."""
+        names = b"".join(bytes([len(name)]) + name for name in (str(player).encode()[:255] for player in players))
+        body = names + pack_moves(moves, cols) + np.asarray(think_times, dtype="<f4").tobytes()
+        header = RECORD_HEADER.pack(RECORD_HEADER.size + len(body), rows, cols, connect, result, first_piece,
+                                    len(moves), len(think_times), seed)
+        self.file.write(header + body)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def check_header(data):
+    if len(data) < FILE_HEADER.size:
+        raise ValueError("Not a game record file")
+    magic, version = FILE_HEADER.unpack(data)
+    if magic != RECORD_MAGIC:
+        raise ValueError("Not a game record file")
+    if version != RECORD_VERSION:
+        raise ValueError(f"Unsupported game record version {version}")
+
+
+def parse_record(offset, header, body):
+    size, rows, cols, connect, result, first_piece, count, times, seed = header
+    players = []
+    position = 0
+    for _ in range(2):
+        length = body[position]
+        players.append(body[position + 1:position + 1 + length].decode())
+        position += 1 + length
+    move_bytes = count if cols > 16 else (count + 1) // 2
+    moves = unpack_moves(body[position:position + move_bytes], count, cols)
+    position += move_bytes
+    think_times = np.frombuffer(body[position:position + 4 * times], dtype="<f4").tolist()
+    return GameRecord(offset, rows, cols, connect, result, first_piece, moves, players, think_times, seed)
+
+
+def read_records(path):
+    """Yields every GameRecord in the log in order, reading the file sequentially."""
+    with open(path, "rb", buffering=1 << 20) as f:
+        check_header(f.read(FILE_HEADER.size))
+        offset = FILE_HEADER.size
+        while True:
+            data = f.read(RECORD_HEADER.size)
+            if len(data) < RECORD_HEADER.size:
+                return  # end of file, or a record cut short by an interrupted write
+            header = RECORD_HEADER.unpack(data)
+            body = f.read(header[0] - RECORD_HEADER.size)
+            if len(body) < header[0] - RECORD_HEADER.size:
+                return
+            yield parse_record(offset, header, body)
+            offset += header[0]
+
+
+def read_record(path, offset):
+    """Reads the single record at offset (GameRecord.offset)."""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        header = RECORD_HEADER.unpack(f.read(RECORD_HEADER.size))
+        return parse_record(offset, header, f.read(header[0] - RECORD_HEADER.size))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize or print a game record log.")
+    parser.add_argument("path")
+    parser.add_argument("--print", action="store_true", help="print every game")
+    args = parser.parse_args(argv)
+    results = [0, 0, 0, 0]
+    games = 0
+    moves = 0
+    for record in read_records(args.path):
+        games += 1
+        moves += len(record.moves)
+        results[record.result] += 1
+        if args.print:
+            print(f"{record.players[0]} vs {record.players[1]} (seed {record.seed}): result {record.result}, "
+                  f"moves {''.join(map(str, record.moves))}")
+    print(f"{games} games, {moves} moves, {os.path.getsize(args.path)} bytes")
+    print(f"Piece 1 wins {results[1]}, piece 2 wins {results[2]}, draws {results[3]}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,394 @@
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import itertools
+import json
+import os
+import random
+import sys
+import time
+import numpy as np
+from board import Board
+from tournament import PlayerConfig
+
+MIN_SIZE = 4
+MAX_SIZE = 20
+
+# Game server: hosts many games at once over a line-delimited JSON protocol. Each request
+# is one JSON object per line and gets one response line; a request "id" is echoed back
+# so clients can have several requests in flight.
+#
+#   {"op": "new", "players": ["human", "minmax:depth=4"], "rows": 6, "cols": 7}
+#       players[0] plays piece 1 and moves first; any player that is not "human" is an
+#       engine configuration as accepted by tournament.py. Games between two engines are
+#       played in the background.
+#   {"op": "move", "game": 1, "col": 3}   a human move; the engines' replies follow
+#   {"op": "state", "game": 1}
+#   {"op": "close", "game": 1}
+#   {"op": "metrics"}
+#
+# Every game response has the moves played, the piece to move and the result in the
+# Board.winner_value convention (0 ongoing, 1 or 2 the winning piece, 3 a draw). Boards
+# have MIN_SIZE to MAX_SIZE rows and columns. A failed request gets {"ok": false, "error":
+# ...}; when an engine fails after a human move, that move is taken back, and a game
+# between engines that fails stops with the error in its state.
+#
+# Engine moves go through EnginePool: a bounded queue, from which batches of requests
+# are sent to a pool of worker processes. When the queue is full, the connections that
+# ask for engine moves wait, and stop reading further requests until there is room.
+
+
+def choose_moves(tasks):
+    """Worker: returns the engine's column for every (config, piece, moves, first piece,
+    rows, cols) task."""
+    cols = []
+    for config, piece, moves, first_piece, rows, board_cols in tasks:
+        player = choose_moves.players.get((config, piece, rows, board_cols))
+        if player is None:
+            player = PlayerConfig.parse(config).create(piece, rows, board_cols)
+            choose_moves.players[config, piece, rows, board_cols] = player
+        board = Board(rows, board_cols)
+        for i, col in enumerate(moves):
+            board.play(col, first_piece if i % 2 == 0 else 3 - first_piece)
+        cols.append(player.choose_move(board))
+        if hasattr(player, "state_action_history"):
+            player.state_action_history.clear()  # Q-learning players only read their table here
+    return cols
+
+
+choose_moves.players = {}
+
+
+class EnginePool:
+    def __init__(self, workers=None, batch_size=16, max_queue=1024, latency_window=10000):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.queue = None
+        self.max_queue = max_queue
+        self.executor = None
+        self.dispatcher = None
+        self.running = set()  # run_batch tasks, referenced until they finish
+        self.in_flight = 0
+        self.moves = 0
+        self.batches = 0
+        self.latencies = collections.deque(maxlen=latency_window)  # seconds from request to move
+
+    async def start(self):
+        self.queue = asyncio.Queue(self.max_queue)
+        self.workers = self.workers or os.cpu_count()
+        self.executor = concurrent.futures.ProcessPoolExecutor(self.workers)
+        self.slots = asyncio.Semaphore(self.workers)  # one batch per worker at a time
+        self.dispatcher = asyncio.create_task(self.dispatch())
+
+    async def close(self):
+        self.dispatcher.cancel()
+        self.executor.shutdown(cancel_futures=True)
+
+    async def choose_move(self, config, piece, board, first_piece):
+        """Returns the engine's move for board; waits while the queue is full."""
+        future = asyncio.get_running_loop().create_future()
+        task = (config, piece, list(board.moves), first_piece, board.get_row(), board.get_col())
+        await self.queue.put((task, future, time.perf_counter()))
+        return await future
+
+    async def dispatch(self):
+        while True:
+            batch = [await self.queue.get()]
+            await self.slots.acquire()
+            # Whatever queued up while waiting for a free worker goes in the same batch
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            task = asyncio.create_task(self.run_batch(batch))
+            self.running.add(task)
+            task.add_done_callback(self.running.discard)
+
+    async def run_batch(self, batch):
+        self.in_flight += len(batch)
+        try:
+            cols = await asyncio.get_running_loop().run_in_executor(
+                self.executor, choose_moves, [task for task, _, _ in batch])
+        except Exception as error:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        finally:
+            self.in_flight -= len(batch)
+            self.slots.release()
+        now = time.perf_counter()
+        for (_, future, queued), col in zip(batch, cols):
+            self.latencies.append(now - queued)
+            if not future.done():
+                future.set_result(col)
+        self.moves += len(batch)
+        self.batches += 1
+
+    def metrics(self):
+        latencies = np.array(self.latencies) * 1000
+        percentiles = np.percentile(latencies, [50, 90, 99]).tolist() if len(latencies) else [0.0, 0.0, 0.0]
+        return {
+            "queue_depth": self.queue.qsize(),
+            "in_flight": self.in_flight,
+            "workers": self.workers,
+            "moves": self.moves,
+            "average_batch": self.moves / self.batches if self.batches else 0.0,
+            "latency_ms": dict(zip(("p50", "p90", "p99"), percentiles)),
+        }
+
+
+class ServerGame:
+    def __init__(self, game_id, players, rows, cols):
+        self.id = game_id
+        self.players = players  # "human" or engine configuration, for piece 1 and 2
+        self.board = Board(rows, cols)
+        self.piece = 1  # piece to move
+        self.result = 0
+        self.error = None  # why a game between engines stopped
+        self.lock = asyncio.Lock()
+
+    def play(self, col):
+        self.board.play(col, self.piece)
+        self.result = self.board.winner_value()
+        self.piece = 3 - self.piece
+
+    def undo(self):
+        self.board.undo()
+        self.result = 0
+        self.piece = 3 - self.piece
+
+    def state(self):
+        state = {"game": self.id, "moves": self.board.moves, "to_move": self.piece, "result": self.result,
+                 "players": self.players}
+        if self.error is not None:
+            state["error"] = self.error
+        return state
+
+
+class GameServer:
+    def __init__(self, pool, max_games=100000, max_pending=64):
+        self.pool = pool
+        self.games = {}
+        self.game_ids = itertools.count(1)
+        self.max_games = max_games
+        self.max_pending = max_pending  # requests in progress per connection
+        self.background = set()
+        self.connections = 0
+        self.requests = 0
+
+    async def handle_client(self, reader, writer):
+        self.connections += 1
+        pending = asyncio.Semaphore(self.max_pending)
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                # Reading stops while this connection has max_pending requests in progress
+                await pending.acquire()
+                task = asyncio.create_task(self.respond(line, writer, pending))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.wait(tasks)
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def respond(self, line, writer, pending):
+        request = {}
+        try:
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("A request is a JSON object")
+                response = await self.handle(request)
+            except KeyError as error:
+                response = {"ok": False, "error": f"Missing field {error}"}
+            except (ValueError, TypeError) as error:
+                response = {"ok": False, "error": str(error)}
+            except Exception as error:
+                response = {"ok": False, "error": f"{type(error).__name__}: {error}"}
+            if "id" in request:
+                response["id"] = request["id"]
+            writer.write(json.dumps(response).encode() + b"\n")
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            pending.release()
+
+    async def handle(self, request):
+        self.requests += 1
+        op = request["op"]
+        if op == "new":
+            return await self.new_game(request)
+        if op == "metrics":
+            return dict(ok=True, games=len(self.games), connections=self.connections, requests=self.requests,
+                        **self.pool.metrics())
+        if op not in ("move", "state", "close"):
+            raise ValueError(f"Unknown op {op!r}")
+        game = self.games.get(request["game"])
+        if game is None:
+            raise ValueError(f"No game {request['game']!r}")
+        if op == "move":
+            return await self.human_move(game, request["col"])
+        if op == "state":
+            return dict(ok=True, **game.state())
+        del self.games[game.id]
+        return {"ok": True, "game": game.id}
+
+    async def new_game(self, request):
+        if len(self.games) >= self.max_games:
+            raise ValueError("Too many games")
+        players = request.get("players", ["human", "minmax"])
+        if type(players) is not list or len(players) != 2:
+            raise ValueError("players is a list of two players")
+        rows = request.get("rows", 6)
+        cols = request.get("cols", 7)
+        for size in (rows, cols):
+            if type(size) is not int or not MIN_SIZE <= size <= MAX_SIZE:
+                raise ValueError(f"Rows and columns are integers from {MIN_SIZE} to {MAX_SIZE}")
+        for player in players:
+            if player != "human":
+                # Building the player once rejects unknown types, options and files here
+                try:
+                    config = PlayerConfig.parse(player)
+                    config.check_board(rows, cols)
+                    config.create(1, rows, cols).close()
+                except Exception as error:
+                    raise ValueError(f"Invalid player {player!r}: {error}") from error
+        game = ServerGame(next(self.game_ids), players, rows, cols)
+        self.games[game.id] = game
+        if "human" in players:
+            async with game.lock:
+                try:
+                    await self.engine_moves(game)
+                except Exception as error:
+                    del self.games[game.id]
+                    raise ValueError(f"Engine failed: {error}") from error
+        else:
+            task = asyncio.create_task(self.engine_game(game))
+            self.background.add(task)
+            task.add_done_callback(self.background.discard)
+        return dict(ok=True, **game.state())
+
+    async def human_move(self, game, col):
+        async with game.lock:
+            if game.result:
+                raise ValueError("The game is over")
+            if game.players[game.piece - 1] != "human":
+                raise ValueError("Not a human player's turn")
+            if type(col) is not int or not 0 <= col < game.board.get_col() or not game.board.is_valid_location(col):
+                raise ValueError(f"Invalid move {col!r}")
+            game.play(col)
+            try:
+                await self.engine_moves(game)
+            except Exception as error:
+                game.undo()  # the human can try again
+                raise ValueError(f"Engine failed: {error}") from error
+            return dict(ok=True, **game.state())
+
+    async def engine_game(self, game):
+        """Plays a game between engines in the background."""
+        try:
+            await self.engine_moves(game)
+        except Exception as error:
+            game.error = f"Engine failed: {error}"
+
+    async def engine_moves(self, game):
+        """Plays engine moves until the game ends or a human is to move."""
+        while not game.result and game.players[game.piece - 1] != "human":
+            first_piece = game.piece if len(game.board.moves) % 2 == 0 else 3 - game.piece
+            col = await self.pool.choose_move(game.players[game.piece - 1], game.piece, game.board, first_piece)
+            game.play(col)
+
+
+async def serve(host="127.0.0.1", port=8765, unix_path=None, workers=None, batch_size=16, max_queue=1024):
+    pool = EnginePool(workers, batch_size, max_queue)
+    await pool.start()
+    server = GameServer(pool)
+    if unix_path:
+        listener = await asyncio.start_unix_server(server.handle_client, unix_path, limit=1 << 16)
+    else:
+        listener = await asyncio.start_server(server.handle_client, host, port, limit=1 << 16)
+    print(f"Serving on {unix_path or f'{host}:{port}'} with {pool.workers} engine workers")
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        await pool.close()
+
+
+async def load_test(host, port, games, engine="minmax:depth=3", connections=4, seed=0):
+    """Plays games random human moves against engine over several connections and
+    returns the server metrics."""
+    rng = random.Random(seed)
+    request_ids = itertools.count()
+
+    async def client(count):
+        reader, writer = await asyncio.open_connection(host, port, limit=1 << 16)
+        waiting = {}
+
+        async def read_responses():
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                response = json.loads(line)
+                waiting.pop(response["id"]).set_result(response)
+
+        async def request(message):
+            message["id"] = next(request_ids)
+            future = asyncio.get_running_loop().create_future()
+            waiting[message["id"]] = future
+            writer.write(json.dumps(message).encode() + b"\n")
+            await writer.drain()
+            return await future
+
+        async def play():
+            state = await request({"op": "new", "players": ["human", engine]})
+            while not state["result"]:
+                valid = [col for col in range(7) if state["moves"].count(col) < 6]
+                state = await request({"op": "move", "game": state["game"], "col": rng.choice(valid)})
+            await request({"op": "close", "game": state["game"]})
+
+        reading = asyncio.create_task(read_responses())
+        await asyncio.gather(*(play() for _ in range(count)))
+        metrics = await request({"op": "metrics"})
+        reading.cancel()
+        writer.close()
+        return metrics
+
+    shares = [games // connections + (i < games % connections) for i in range(connections)]
+    results = await asyncio.gather(*(client(share) for share in shares if share))
+    return results[-1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve Connect Four games over line-delimited JSON.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="listen on this Unix socket path instead")
+    parser.add_argument("--workers", type=int, default=None, help="engine processes")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--max-queue", type=int, default=1024, help="engine requests waiting before clients block")
+    parser.add_argument("--load-test", type=int, metavar="GAMES",
+                        help="instead of serving, play GAMES random games against a running server")
+    parser.add_argument("--engine", default="minmax:depth=3", help="engine the load test plays against")
+    args = parser.parse_args(argv)
+    if args.load_test:
+        start = time.perf_counter()
+        metrics = asyncio.run(load_test(args.host, args.port, args.load_test, args.engine))
+        print(f"{args.load_test} games in {time.perf_counter() - start:.1f}s")
+        print(json.dumps(metrics, indent=2))
+        return
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, args.workers, args.batch_size, args.max_queue))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    sys.exit(main())
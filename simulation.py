@@ -0,0 +1,72 @@
+import random
+import sys
+import time
+from board import Board
+
+ROWS = 6
+COLS = 7
+CONNECT = 4
+
+
+# GameResult holds the outcome of one headless game
+class GameResult:
+    def __init__(self, winner, moves, first, think_times, move_counts):
+        self.winner = winner  # player_number of the winner, 0 for a draw
+        self.moves = moves  # columns in the order they were played
+        self.first = first  # index (0 or 1) of the player who moved first
+        self.think_times = think_times  # seconds each move took to choose
+        self.move_counts = move_counts  # moves made by player 1 and player 2
+
+    def __repr__(self):
+        return f"GameResult(winner={self.winner}, moves={len(self.moves)}, first={self.first})"
+
+
+def play_game(player1, player2, rows=ROWS, cols=COLS, first=None, connect=CONNECT):
+    """Plays one game between two Player instances with no rendering, sleeps or timers.
+    The first player is picked at random unless first (0 or 1) is given; connect pieces
+    in a line win."""
+    board = Board(rows, cols, connect)
+    players = [player1, player2]
+    turn = random.randint(0, 1) if first is None else first
+    first = turn
+    start_counts = [player.get_move_count() for player in players]
+    moves = []
+    think_times = []
+    winner = 0
+    while not board.is_full():
+        player = players[turn]
+        start = time.perf_counter()
+        col = player.choose_move(board)
+        think_times.append(time.perf_counter() - start)
+        moves.append(col)
+        if player.move(board, col):
+            winner = player.player_number
+            break
+        turn = (turn + 1) % 2
+    move_counts = [player.get_move_count() - count for player, count in zip(players, start_counts)]
+    return GameResult(winner, moves, first, think_times, move_counts)
+
+
+def play_games(player1, player2, total_games, rows=ROWS, cols=COLS, connect=CONNECT):
+    """Plays total_games headless games and yields each GameResult."""
+    for _ in range(total_games):
+        yield play_game(player1, player2, rows, cols, connect=connect)
+
+
+if __name__ == "__main__":
+    from player import minMaxPlayer, RandomPlayer
+
+    total_games = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    wins = {0: 0, 1: 0, 2: 0}
+    total_moves = {1: 0, 2: 0}
+    start = time.perf_counter()
+    for result in play_games(minMaxPlayer(1, 1, None), RandomPlayer(2, 2, None), total_games):
+        wins[result.winner] += 1
+        if result.winner:
+            total_moves[result.winner] += result.move_counts[result.winner - 1]
+    elapsed = time.perf_counter() - start
+    print(f"Played {total_games} games in {elapsed:.1f}s")
+    print(f"Number of Tie games: {wins[0]}")
+    for number in (1, 2):
+        print(f"Player {number} win percentage: {wins[number] / total_games * 100}%, "
+              f"avg moves: {total_moves[number] / total_games}")
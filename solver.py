@@ -0,0 +1,187 @@
+import time
+
+# Exact Connect Four solver: negamax with alpha-beta on bitboards relative to the side to
+# move, with a transposition table and null-window probes driving a binary search on the
+# score. It uses the same bit layout as Board (row+1 bits per column, bottom cell first).
+#
+# Scores follow the usual convention: a positive score means the side to move wins,
+# (cells + 1 - moves) // 2 where moves is the number of pieces on the board before the
+# winning piece, so faster wins score higher. Negative scores are losses, 0 is a draw.
+
+
+class Solver:
+    CHECK_INTERVAL = 64
+
+    def __init__(self, rows=6, cols=7, max_entries=1 << 20):
+        self.rows = rows
+        self.cols = cols
+        self.cells = rows * cols
+        self.stride = rows + 1
+        self.bottom = sum(1 << (c * self.stride) for c in range(cols))
+        self.board_mask = self.bottom * ((1 << rows) - 1)
+        self.column_masks = [((1 << rows) - 1) << (c * self.stride) for c in range(cols)]
+        self.bottom_masks = [1 << (c * self.stride) for c in range(cols)]
+        self.top_masks = [1 << (rows - 1 + c * self.stride) for c in range(cols)]
+        # Columns from the center outwards, tried first by the search
+        self.column_order = [cols // 2 + (1 - 2 * (i % 2)) * ((i + 1) // 2) for i in range(cols)]
+        self.max_entries = max_entries
+        self.table = {}  # position key -> (lower bound, upper bound)
+        self.nodes = 0
+        # When set, called every CHECK_INTERVAL nodes; an exception it raises abandons the
+        # solve, leaving only complete results in the table
+        self.check = None
+        self.next_check = 0
+
+    def winning_cells(self, position, mask):
+        """Returns the empty cells that would complete four in a row for position."""
+        stride = self.stride
+        # Vertical
+        r = (position << 1) & (position << 2) & (position << 3)
+        # Horizontal and both diagonals
+        for shift in (stride, stride - 1, stride + 1):
+            p = (position << shift) & (position << 2 * shift)
+            r |= p & (position << 3 * shift)
+            r |= p & (position >> shift)
+            p = (position >> shift) & (position >> 2 * shift)
+            r |= p & (position << shift)
+            r |= p & (position >> 3 * shift)
+        return r & (self.board_mask ^ mask)
+
+    def negamax(self, current, mask, moves, alpha, beta):
+        """Returns the exact score if it lies in (alpha, beta), otherwise a bound on the
+        side of the window it fell outside."""
+        self.nodes += 1
+        if self.check is not None and self.nodes >= self.next_check:
+            self.next_check = self.nodes + self.CHECK_INTERVAL
+            self.check()
+        possible = (mask + self.bottom) & self.board_mask
+        opponent = current ^ mask
+        opponent_wins = self.winning_cells(opponent, mask)
+        forced = possible & opponent_wins
+        if forced:
+            if forced & (forced - 1):
+                return -((self.cells - moves) // 2)  # two threats at once, the game is lost
+            possible = forced
+        # Never play directly below a cell that would let the opponent win
+        possible &= ~(opponent_wins >> 1)
+        if not possible:
+            return -((self.cells - moves) // 2)
+
+        if moves >= self.cells - 2:
+            return 0  # no win is possible any more
+
+        lowest = -((self.cells - 2 - moves) // 2)  # the opponent cannot win on its next move
+        if alpha < lowest:
+            alpha = lowest
+            if alpha >= beta:
+                return alpha
+        highest = (self.cells - 1 - moves) // 2  # we cannot win on this move
+        if beta > highest:
+            beta = highest
+            if alpha >= beta:
+                return beta
+
+        key = current + mask + self.bottom
+        bounds = self.table.get(key)
+        if bounds is not None:
+            lower, upper = bounds
+            if lower > alpha:
+                alpha = lower
+            if upper < beta:
+                beta = upper
+            if alpha >= beta:
+                return alpha
+
+        # Order moves by how many winning cells they create, center columns first on ties
+        candidates = []
+        for i, col in enumerate(self.column_order):
+            move = possible & self.column_masks[col]
+            if move:
+                threats = self.winning_cells(current | move, mask).bit_count()
+                candidates.append((-threats, i, move))
+        candidates.sort()
+
+        original_alpha = alpha
+        best = -self.cells
+        for _, _, move in candidates:
+            score = -self.negamax(opponent, mask | move, moves + 1, -beta, -alpha)
+            if score > best:
+                best = score
+            if score >= beta:
+                break
+            if score > alpha:
+                alpha = score
+
+        if len(self.table) >= self.max_entries:
+            self.table.clear()
+        lower, upper = bounds if bounds is not None else (-self.cells, self.cells)
+        if best <= original_alpha:
+            upper = min(upper, best)
+        elif best >= beta:
+            lower = max(lower, best)
+        else:
+            lower = upper = best
+        self.table[key] = (lower, upper)
+        return best
+
+    def solve_position(self, current, mask, moves):
+        """Returns the exact score using null-window probes in a binary search."""
+        # A move that wins at once is not seen by negamax, which assumes it was checked
+        if self.winning_cells(current, mask) & ((mask + self.bottom) & self.board_mask):
+            return (self.cells + 1 - moves) // 2
+        low = -((self.cells - moves) // 2)
+        high = (self.cells + 1 - moves) // 2
+        while low < high:
+            middle = low + (high - low) // 2
+            # Probe closer to 0 first, where most scores are
+            if middle <= 0 and int(low / 2) < middle:
+                middle = int(low / 2)
+            elif middle >= 0 and int(high / 2) > middle:
+                middle = int(high / 2)
+            score = self.negamax(current, mask, moves, middle, middle + 1)
+            if score <= middle:
+                high = score
+            else:
+                low = score
+        return low
+
+    def solve(self, board, piece):
+        """Solves board with piece to move. Returns (col, score, plies) where score is
+        from piece's point of view and plies is the number of moves until the game is
+        decided with perfect play (until the board is full for a draw)."""
+        current = board.masks[piece]
+        mask = board.masks[1] | board.masks[2]
+        moves = bin(mask).count("1")
+        best_col = None
+        best_score = None
+        for col in self.column_order:
+            if not board.is_valid_location(col):
+                continue
+            move = (mask + self.bottom_masks[col]) & self.column_masks[col]
+            if self.winning_cells(current, mask) & move:
+                score = (self.cells + 1 - moves) // 2
+            else:
+                score = -self.solve_position(current ^ mask, mask | move, moves + 1)
+            if best_score is None or score > best_score:
+                best_col, best_score = col, score
+        return best_col, best_score, self.plies(best_score, moves)
+
+    def plies(self, score, moves):
+        """Number of moves from a position with the given number of pieces until the
+        result the score stands for."""
+        if score == 0:
+            return self.cells - moves
+        # The winner's pieces go down when the piece count has its parity
+        winner_parity = moves if score > 0 else moves + 1
+        winning_moves = self.cells + 1 - 2 * abs(score)
+        if (winning_moves - winner_parity) % 2:
+            winning_moves -= 1
+        return winning_moves - moves + 1
+
+
+def timed_solve(board, piece, solver=None):
+    """Solves board and returns (col, score, plies, seconds)."""
+    solver = solver or Solver(board.get_row(), board.get_col())
+    start = time.perf_counter()
+    col, score, plies = solver.solve(board, piece)
+    return col, score, plies, time.perf_counter() - start
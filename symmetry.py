@@ -0,0 +1,48 @@
+import numpy as np
+
+# Connect Four is symmetric under left-right reflection: a position and its mirror image
+# have the same value, with every move mapped to the mirrored column. Caches store each
+# pair once under the smaller of the two position keys (the canonical key).
+
+
+def mirror_col(col, cols):
+    """Maps a column to the same column of the mirrored board."""
+    return cols - 1 - col
+
+
+def canonical_key(board):
+    """Returns (key, mirrored) for a Board: the canonical key of the position and whether
+    the canonical orientation is the mirror image, in which case moves stored under the
+    key must be mapped through mirror_col."""
+    if board.mirror_key < board.position_key:
+        return board.mirror_key, True
+    return board.position_key, False
+
+
+def mirror_key(key, rows, cols):
+    """Returns the position key of the mirror image of the position with the given key."""
+    stride = rows + 1
+    column_mask = (1 << stride) - 1
+    mirrored = 0
+    for c in range(cols):
+        mirrored |= ((key >> (c * stride)) & column_mask) << ((cols - 1 - c) * stride)
+    return mirrored
+
+
+def canonical_keys(keys, rows, cols):
+    """Vectorized canonical_key for an int64 array of position keys; returns
+    (canonical keys, mirrored flags)."""
+    keys = np.asarray(keys, dtype=np.int64)
+    stride = rows + 1
+    column_mask = np.int64((1 << stride) - 1)
+    mirrored = np.zeros_like(keys)
+    for c in range(cols):
+        mirrored |= ((keys >> (c * stride)) & column_mask) << ((cols - 1 - c) * stride)
+    flags = mirrored < keys
+    return np.where(flags, mirrored, keys), flags
+
+
+def canonical_index(key, mirrored):
+    """Packs a canonical key and its mirrored flag into one int, the flag being the low
+    bit; index >> 1 is the key to store under and index & 1 the orientation."""
+    return key * 2 + mirrored
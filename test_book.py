@@ -0,0 +1,34 @@
+from book import OpeningBook, build_book, opening_positions, replay
+from board import Board
+from symmetry import mirror_col
+
+
+def test_book_round_trip(tmp_path):
+    path = tmp_path / "opening.c4b"
+    count = build_book(path, plies=3, depth=2, workers=1, report=None)
+    positions = list(opening_positions(3))
+    assert count == len(positions)
+
+    book = OpeningBook(path)
+    for moves, first_piece in positions:
+        board, piece = replay(moves, first_piece, 6, 7)
+        entry = book.lookup(board, piece)
+        assert entry is not None
+        col, score = entry
+        assert board.is_valid_location(col)
+        # The mirror image is stored under the same entry, with the move mirrored
+        mirror, _ = replay([mirror_col(move, 7) for move in moves], first_piece, 6, 7)
+        assert book.lookup(mirror, piece) == (mirror_col(col, 7), score)
+    assert (book.rows, book.cols, book.plies, book.depth) == (6, 7, 3, 2)
+
+
+def test_book_misses(tmp_path):
+    path = tmp_path / "opening.c4b"
+    build_book(path, plies=2, depth=2, workers=1, report=None)
+    book = OpeningBook(path)
+    # Beyond the book's plies, another board size or another connect length
+    board, piece = replay([3, 3], 1, 6, 7)
+    assert book.lookup(board, piece) is None
+    assert book.lookup(Board(7, 7), 1) is None
+    assert book.lookup(Board(6, 7, 5), 1) is None
+    assert book.lookup(Board(6, 7), 1) is not None
@@ -0,0 +1,50 @@
+import random
+from board import Board
+from player import minMaxPlayer
+
+SIZES = ((6, 7, 4), (5, 4, 4), (4, 9, 4), (7, 9, 5), (10, 10, 6))
+
+
+def windows(board):
+    """Yields every line of connect cells of board.board, scanned cell by cell."""
+    rows, cols, length = board.get_row(), board.get_col(), board.connect
+    cells = board.board.tolist()
+    for r in range(rows):
+        for c in range(cols):
+            for dr, dc in ((0, 1), (1, 0), (1, 1), (-1, 1)):
+                end_r, end_c = r + dr * (length - 1), c + dc * (length - 1)
+                if 0 <= end_r < rows and end_c < cols:
+                    yield [cells[r + dr * i][c + dc * i] for i in range(length)]
+
+
+def reference_score(player, board, piece):
+    center = [row[board.get_col() // 2] for row in board.board.tolist()]
+    return center.count(piece) * 6 + sum(player.evaluate_window(window, piece) for window in windows(board))
+
+
+def reference_win(board, piece):
+    return any(window.count(piece) == board.connect for window in windows(board))
+
+
+def check(player, board):
+    for piece in (1, 2):
+        assert player.score_position(board, piece) == reference_score(player, board, piece)
+        assert board.winning_move(piece) == reference_win(board, piece)
+
+
+def test_window_counters_match_a_board_scan():
+    rng = random.Random(0)
+    player = minMaxPlayer(1, 1, None)
+    for rows, cols, connect in SIZES:
+        for _ in range(8):
+            board = Board(rows, cols, connect)
+            piece = 1
+            check(player, board)
+            while not board.is_full() and not board.winner_value():
+                board.play(rng.choice(board.get_valid_locations()), piece)
+                check(player, board)
+                piece = 3 - piece
+            # Taking the moves back restores the counters too
+            for _ in range(rng.randint(1, len(board.moves))):
+                board.undo()
+                check(player, board)
@@ -0,0 +1,27 @@
+from parallel import ParallelSearch, random_positions
+from player import minMaxPlayer
+
+
+def test_parallel_search_matches_serial():
+    parallel = ParallelSearch(workers=2)
+    try:
+        for board, piece in random_positions(6, 6, seed=3):
+            serial = minMaxPlayer(piece, piece, None, solver_threshold=0)
+            expected = serial.search(board, 4)
+            player = minMaxPlayer(piece, piece, None, solver_threshold=0)
+            assert parallel.search(player, board, 4) == expected
+            assert len(board.moves) == 6
+    finally:
+        parallel.close()
+
+
+def test_workers_option_searches_in_parallel():
+    board, piece = random_positions(1, 4, seed=4)[0]
+    serial = minMaxPlayer(piece, piece, None, depth=4, solver_threshold=0)
+    player = minMaxPlayer(piece, piece, None, depth=4, solver_threshold=0, workers=2)
+    try:
+        assert player.choose_move(board) == serial.choose_move(board)
+        assert player.last_score == serial.last_score
+        assert player.parallel is not None and player.parallel.pool is not None
+    finally:
+        player.close()
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+from board import Board
+from player import QLearningPlayer
+from qtable import MappedQTable, QTable, merge_files
+
+
+def filled_table(keys, cols=7, offset=0.0):
+    table = QTable(0.6, cols=cols)
+    for key in keys:
+        table.get(key, write=True)[:] = np.arange(cols) + key + offset
+    return table
+
+
+def test_save_round_trip(tmp_path):
+    table = filled_table(range(1, 3000))  # enough states to grow the index
+    table.save(tmp_path / "q.c4q")
+    mapped = MappedQTable(tmp_path / "q.c4q")
+    assert len(mapped) == len(table) and mapped.cols == 7 and mapped.q_init == 0.6
+    for key in range(1, 3000):
+        assert np.array_equal(mapped.lookup(key), table.lookup(key))
+    assert mapped.lookup(5000) is None
+    assert np.array_equal(mapped.lookup_many([1, 5000])[1], np.full(7, 0.6, dtype=np.float32))
+
+
+def test_checkpoints_append_changed_states(tmp_path):
+    path = tmp_path / "q.c4q"
+    table = filled_table([1, 2, 3])
+    assert table.checkpoint(path) == 3
+    table.get(2, write=True)[0] = 42.0
+    table.get(4)  # only read, so not checkpointed
+    table.save(tmp_path / "snapshot.c4q")  # a snapshot must not reset the checkpoint
+    table.get(5, write=True)[0] = 7.0
+    assert table.checkpoint(path) == 2
+    assert table.checkpoint(path) == 0
+
+    mapped = MappedQTable(path)
+    assert len(mapped.segments) == 2
+    assert mapped.lookup(2)[0] == 42.0 and mapped.lookup(5)[0] == 7.0
+    assert mapped.lookup(1)[0] == table.lookup(1)[0]
+    assert 4 not in mapped
+
+
+def test_merge_files(tmp_path):
+    filled_table([1, 2]).save(tmp_path / "a.c4q")
+    filled_table([2, 3], offset=100.0).save(tmp_path / "b.c4q")
+    merge_files(tmp_path / "a.c4q", tmp_path / "b.c4q")
+    mapped = MappedQTable(tmp_path / "a.c4q")
+    assert len(mapped) == 3
+    assert mapped.lookup(1)[0] == 1.0
+    assert mapped.lookup(2)[0] == 102.0  # the merged file wins
+    assert mapped.lookup(3)[0] == 103.0
+
+
+def test_mirrored_index_through_saved_table(tmp_path):
+    board = Board(6, 7)
+    mirror = Board(6, 7)
+    for col, piece in ((0, 1), (1, 2), (0, 1)):
+        board.play(col, piece)
+        mirror.play(6 - col, piece)
+    player = QLearningPlayer(1, 1, None)
+    q_values = player.get_q_values(player.index_board(board), 7, write=True)
+    q_values[:] = np.arange(7)
+    player.save(tmp_path / "q.c4q")
+
+    loaded = QLearningPlayer(1, 1, None, table_path=tmp_path / "q.c4q")
+    assert np.array_equal(loaded.get_q_values(loaded.index_board(board), 7), np.arange(7))
+    assert np.array_equal(loaded.get_q_values(loaded.index_board(mirror), 7), np.arange(7)[::-1])
+
+
+def test_board_size_checked_on_construction(tmp_path):
+    with pytest.raises(ValueError):
+        QLearningPlayer(1, 1, None, rows=9, cols=9)  # 90-bit position keys
+    filled_table([1], cols=8).save(tmp_path / "q8.c4q")
+    with pytest.raises(ValueError):
+        QLearningPlayer(1, 1, None, table_path=tmp_path / "q8.c4q")
+    player = QLearningPlayer(1, 1, None, table_path=tmp_path / "q8.c4q", rows=6, cols=8)
+    assert player.stateAction_values.cols == 8
@@ -0,0 +1,68 @@
+import random
+from board import Board
+from solver import Solver
+
+
+def brute_force(board, piece, memo):
+    """Returns (score, plies) for piece to move by searching every line to the end, with
+    the solver's score convention; the winner takes the fastest win, the loser the
+    slowest loss."""
+    key = board.position_key
+    if key in memo:
+        return memo[key]
+    cells = board.get_row() * board.get_col()
+    moves = len(board.moves)
+    best = None
+    for col in board.get_valid_locations():
+        board.play(col, piece)
+        if board.winning_move(piece):
+            result = ((cells + 1 - moves) // 2, 1)
+        elif board.is_full():
+            result = (0, 1)
+        else:
+            score, plies = brute_force(board, 3 - piece, memo)
+            result = (-score, plies + 1)
+        board.undo()
+        if best is None or rank(result) > rank(best):
+            best = result
+    memo[key] = best
+    return best
+
+
+def rank(result):
+    score, plies = result
+    return score, -plies if score > 0 else plies
+
+
+def positions(rows, cols, count, plies, seed=0):
+    """Yields (board, piece to move) for the empty board and count unfinished random
+    positions after plies moves."""
+    yield Board(rows, cols), 1
+    rng = random.Random(seed)
+    while count:
+        board = Board(rows, cols)
+        piece = 1
+        for _ in range(plies):
+            board.play(rng.choice(board.get_valid_locations()), piece)
+            if board.winning_move(piece):
+                break
+            piece = 3 - piece
+        else:
+            count -= 1
+            yield board, piece
+
+
+def test_solver_matches_brute_force():
+    for rows, cols, plies in ((4, 4, 2), (4, 5, 8), (5, 4, 8)):
+        memo = {}
+        solver = Solver(rows, cols)
+        for board, piece in positions(rows, cols, 10, plies):
+            if (rows, cols) != (4, 4) and not board.moves:
+                continue  # too many positions for the brute force search
+            col, score, plies_left = solver.solve(board, piece)
+            assert (score, plies_left) == brute_force(board, piece, memo)
+            # The chosen move reaches the same result
+            board.play(col, piece)
+            if not board.winning_move(piece) and not board.is_full():
+                assert brute_force(board, 3 - piece, memo)[0] == -score
+            board.undo()
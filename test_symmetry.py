@@ -0,0 +1,74 @@
+import random
+import numpy as np
+from board import Board
+from player import minMaxPlayer, QLearningPlayer
+from symmetry import canonical_key, canonical_keys, mirror_col, mirror_key
+
+
+def random_boards(count, rows=6, cols=7, seed=0):
+    """Yields (board, mirror image) pairs of random unfinished positions."""
+    rng = random.Random(seed)
+    while count:
+        board = Board(rows, cols)
+        mirror = Board(rows, cols)
+        piece = 1
+        for _ in range(rng.randint(0, rows * cols // 2)):
+            col = rng.choice(board.get_valid_locations())
+            board.play(col, piece)
+            mirror.play(mirror_col(col, cols), piece)
+            if board.winner_value():
+                break
+            piece = 3 - piece
+        if not board.winner_value():
+            count -= 1
+            yield board, mirror
+
+
+def test_mirror_key_round_trip():
+    for rows, cols in ((6, 7), (5, 4), (7, 8)):
+        for board, mirror in random_boards(20, rows, cols):
+            assert mirror_key(board.position_key, rows, cols) == board.mirror_key
+            assert mirror_key(mirror_key(board.position_key, rows, cols), rows, cols) == board.position_key
+            assert mirror.position_key == board.mirror_key
+
+
+def test_canonical_key_of_mirror_image():
+    for board, mirror in random_boards(50):
+        key, mirrored = canonical_key(board)
+        mirror_canonical, mirror_mirrored = canonical_key(mirror)
+        assert key == mirror_canonical == min(board.position_key, board.mirror_key)
+        assert mirrored == (board.mirror_key < board.position_key)
+        if board.position_key != board.mirror_key:
+            assert mirrored != mirror_mirrored
+
+
+def test_canonical_keys_matches_canonical_key():
+    boards = [board for board, _ in random_boards(50)]
+    keys, flags = canonical_keys([board.position_key for board in boards], 6, 7)
+    for board, key, flag in zip(boards, keys.tolist(), flags.tolist()):
+        assert (key, flag) == canonical_key(board)
+
+
+def test_mirror_col_through_transposition_table():
+    for board, mirror in random_boards(10, seed=1):
+        player = minMaxPlayer(1, 1, None, solver_threshold=0)
+        col, _ = player.search(board, 3)
+        # The move stored for the canonical key, read back in each orientation
+        moves = []
+        for position in (board, mirror):
+            key, mirrored = canonical_key(position)
+            entry = player.tt.probe(key * 2 + True)
+            moves.append(mirror_col(entry[3], 7) if mirrored else entry[3])
+        assert moves == [col, mirror_col(col, 7)]
+
+
+def test_mirrored_q_values_share_a_row():
+    player = QLearningPlayer(1, 1, None)
+    for board, mirror in random_boards(10, seed=2):
+        if board.position_key == board.mirror_key:
+            continue
+        q_values = player.get_q_values(player.index_board(board), 7)
+        mirror_values = player.get_q_values(player.index_board(mirror), 7)
+        mirror_values[0] = 42.0
+        assert q_values[6] == 42.0
+        assert np.array_equal(q_values, mirror_values[::-1])
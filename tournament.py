@@ -0,0 +1,223 @@
+import argparse
+import ast
+import math
+import multiprocessing
+import random
+import sys
+import time
+import numpy as np
+from records import GameRecordWriter
+from simulation import play_game, ROWS, COLS, CONNECT
+
+PLAYER_TYPES = ("minmax", "mcts", "qlearning", "random")
+
+
+# PlayerConfig describes a player by type name and constructor arguments so it can be
+# sent to worker processes and rebuilt there for every game
+class PlayerConfig:
+    def __init__(self, kind, **kwargs):
+        if kind not in PLAYER_TYPES:
+            raise ValueError(f"Unknown player type {kind!r}, expected one of {', '.join(PLAYER_TYPES)}")
+        self.kind = kind
+        self.kwargs = kwargs
+
+    @classmethod
+    def parse(cls, text):
+        """Parses 'kind' or 'kind:key=value,key=value', e.g. 'minmax:depth=4'."""
+        kind, _, options = text.partition(":")
+        kwargs = {}
+        for option in filter(None, options.split(",")):
+            key, _, value = option.partition("=")
+            try:
+                kwargs[key.strip()] = ast.literal_eval(value.strip())
+            except (ValueError, SyntaxError):
+                kwargs[key.strip()] = value.strip()
+        return cls(kind.strip(), **kwargs)
+
+    def create(self, player_number, rows=ROWS, cols=COLS):
+        """Returns a new player for games on a rows x cols board."""
+        from player import minMaxPlayer, MCTSPlayer, QLearningPlayer, RandomPlayer
+        player_class = {"minmax": minMaxPlayer, "mcts": MCTSPlayer, "qlearning": QLearningPlayer,
+                        "random": RandomPlayer}[self.kind]
+        kwargs = self.kwargs
+        if self.kind == "qlearning":
+            kwargs = {"rows": rows, "cols": cols, **kwargs}  # the size its table is for
+        return player_class(player_number, player_number, None, **kwargs)
+
+    def check_board(self, rows, cols):
+        """Raises ValueError if the player cannot play on a rows x cols board."""
+        if self.kind == "qlearning":
+            from player import QLearningPlayer
+            QLearningPlayer.check_board_size(rows, cols)
+
+    def __str__(self):
+        options = ",".join(f"{key}={value}" for key, value in self.kwargs.items())
+        return f"{self.kind}:{options}" if options else self.kind
+
+
+def play_match(task):
+    """Plays one seeded game in a worker process and returns its result as a dict."""
+    index, seed, config1, config2, first, rows, cols, connect = task
+    random.seed(seed)
+    np.random.seed(seed % 2 ** 32)
+    players = (config1.create(1, rows, cols), config2.create(2, rows, cols))
+    try:
+        result = play_game(*players, rows, cols, first, connect)
+    finally:
+        for player in players:
+            player.close()
+    # Moves alternate starting with the first player, so split think times by parity
+    times = [[], []]
+    for ply, think_time in enumerate(result.think_times):
+        times[(result.first + ply) % 2].append(think_time)
+    return {"index": index, "seed": seed, "winner": result.winner, "first": result.first,
+            "moves": len(result.moves), "think_times": times, "columns": result.moves,
+            "move_times": result.think_times}
+
+
+def wilson_interval(successes, trials, z=1.96):
+    """Wilson score interval for a binomial proportion."""
+    if trials == 0:
+        return 0.0, 0.0
+    p = successes / trials
+    denominator = 1 + z * z / trials
+    center = (p + z * z / (2 * trials)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+# TournamentStats aggregates per-game results as they arrive
+class TournamentStats:
+    def __init__(self):
+        self.games = 0
+        self.wins = [0, 0]
+        self.draws = 0
+        self.total_moves = 0
+        self.winning_moves = [0, 0]  # moves each player needed for its wins
+        self.think_times = [[], []]
+
+    def add(self, result):
+        self.games += 1
+        self.total_moves += result["moves"]
+        if result["winner"] == 0:
+            self.draws += 1
+        else:
+            self.wins[result["winner"] - 1] += 1
+            # The winner made the last move, so it played the larger half of the moves
+            self.winning_moves[result["winner"] - 1] += (result["moves"] + 1) // 2
+        for player in (0, 1):
+            self.think_times[player].extend(result["think_times"][player])
+
+    def latency_percentiles(self, player, percentiles=(50, 90, 99)):
+        """Per-move think time percentiles in milliseconds."""
+        times = self.think_times[player]
+        if not times:
+            return {f"p{p}": 0.0 for p in percentiles}
+        values = np.percentile(np.array(times) * 1000, percentiles)
+        return {f"p{p}": float(value) for p, value in zip(percentiles, values)}
+
+    def summary(self):
+        games = max(self.games, 1)
+        players = []
+        for player in (0, 1):
+            wins = self.wins[player]
+            losses = self.wins[1 - player]
+            # Score counts a draw as half a win; its interval uses the normal approximation
+            score = (wins + 0.5 * self.draws) / games
+            outcomes = [1.0] * wins + [0.5] * self.draws + [0.0] * losses
+            score_margin = 1.96 * float(np.std(outcomes)) / math.sqrt(games) if outcomes else 0.0
+            players.append({
+                "wins": wins,
+                "losses": losses,
+                "win_rate": wins / games,
+                "loss_rate": losses / games,
+                "win_rate_ci95": wilson_interval(wins, self.games),
+                "score": score,
+                "score_ci95": (max(0.0, score - score_margin), min(1.0, score + score_margin)),
+                "avg_moves_to_win": self.winning_moves[player] / wins if wins else 0.0,
+                "moves_played": len(self.think_times[player]),
+                "latency_ms": self.latency_percentiles(player),
+            })
+        return {
+            "games": self.games,
+            "draws": self.draws,
+            "draw_rate": self.draws / games,
+            "draw_rate_ci95": wilson_interval(self.draws, self.games),
+            "avg_moves": self.total_moves / games,
+            "players": players,
+        }
+
+
+def run_tournament(config1, config2, total_games, workers=None, seed=0, rows=ROWS, cols=COLS, connect=CONNECT):
+    """Plays total_games between two PlayerConfigs across a process pool and yields
+    each game's result as soon as it finishes. Game i uses seed + i and player 1
+    moves first in even games, so a run is reproducible for any number of workers."""
+    config1.check_board(rows, cols)
+    config2.check_board(rows, cols)
+    tasks = ((i, seed + i, config1, config2, i % 2, rows, cols, connect) for i in range(total_games))
+    if workers == 1:
+        for task in tasks:
+            yield play_match(task)
+        return
+    with multiprocessing.Pool(workers) as pool:
+        yield from pool.imap_unordered(play_match, tasks)
+
+
+def print_summary(summary, config1, config2, elapsed):
+    print("**************")
+    print(f"{summary['games']} games in {elapsed:.1f}s")
+    low, high = summary["draw_rate_ci95"]
+    print(f"Draws: {summary['draws']} ({summary['draw_rate'] * 100:.1f}%, 95% CI {low * 100:.1f}-{high * 100:.1f}%)")
+    print(f"Average game length: {summary['avg_moves']:.1f} moves")
+    for number, (config, stats) in enumerate(zip((config1, config2), summary["players"]), 1):
+        print("**************")
+        low, high = stats["win_rate_ci95"]
+        print(f"Player {number} ({config}): {stats['wins']} wins, {stats['losses']} losses")
+        print(f"  win rate {stats['win_rate'] * 100:.1f}% (95% CI {low * 100:.1f}-{high * 100:.1f}%)")
+        low, high = stats["score_ci95"]
+        print(f"  score {stats['score']:.3f} (95% CI {low:.3f}-{high:.3f})")
+        print(f"  avg moves to win {stats['avg_moves_to_win']:.1f}")
+        latency = stats["latency_ms"]
+        print(f"  move latency p50 {latency['p50']:.2f} ms, p90 {latency['p90']:.2f} ms, p99 {latency['p99']:.2f} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play a headless tournament between two players.")
+    parser.add_argument("player1", help="player type and options, e.g. minmax:depth=4")
+    parser.add_argument("player2", help="player type and options, e.g. random")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--quiet", action="store_true", help="do not print each game as it finishes")
+    parser.add_argument("--record", help="append every game to this game record log")
+    parser.add_argument("--rows", type=int, default=ROWS)
+    parser.add_argument("--cols", type=int, default=COLS)
+    parser.add_argument("--connect", type=int, default=CONNECT, help="pieces in a line needed to win")
+    args = parser.parse_args(argv)
+
+    config1 = PlayerConfig.parse(args.player1)
+    config2 = PlayerConfig.parse(args.player2)
+    for config in (config1, config2):
+        try:
+            config.check_board(args.rows, args.cols)
+        except ValueError as error:
+            parser.error(str(error))
+    stats = TournamentStats()
+    writer = GameRecordWriter(args.record) if args.record else None
+    start = time.perf_counter()
+    for result in run_tournament(config1, config2, args.games, args.workers, args.seed, args.rows, args.cols,
+                                 args.connect):
+        stats.add(result)
+        if writer:
+            writer.write(result["columns"], result["winner"] or 3, result["first"] + 1, (config1, config2),
+                         result["move_times"], result["seed"], args.rows, args.cols, args.connect)
+        if not args.quiet:
+            outcome = f"PLAYER {result['winner']} WINS" if result["winner"] else "Draw"
+            print(f"Game {result['index'] + 1} (seed {result['seed']}): {outcome} after {result['moves']} moves")
+    if writer:
+        writer.close()
+    print_summary(stats.summary(), config1, config2, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
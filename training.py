@@ -0,0 +1,114 @@
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+from vecenv import VectorEnv, QLearningPolicy, self_play
+
+
+def train_shard(task):
+    """Worker: plays self-play episodes against a snapshot of both Q-tables and returns
+    each player's changes as (keys, deltas) relative to the snapshot."""
+    snapshot_paths, episodes, num_envs, seed, epsilon, rows, cols = task
+    from player import QLearningPlayer
+    players = [QLearningPlayer(number, number, None, table_path=path, rows=rows, cols=cols)
+               for number, path in enumerate(snapshot_paths, 1)]
+    env = VectorEnv(num_envs, rows, cols, seed=seed)
+    policies = {player.piece: QLearningPolicy(player, num_envs, epsilon, seed + player.piece)
+                for player in players}
+    self_play(env, policies, episodes)
+    updates = []
+    for player in players:
+        table = player.stateAction_values
+        keys = table.keys()
+        deltas = table.values[:table.count] - table.base.lookup_many(keys)
+        # States that were only read have no change to report
+        changed = np.any(deltas != 0, axis=1)
+        updates.append((keys[changed], deltas[changed]))
+    return updates
+
+
+def merge_updates(table, shard_updates):
+    """Adds the average of the workers' deltas for every state to the master table."""
+    shard_updates = [(keys, deltas) for keys, deltas in shard_updates if len(keys)]
+    if not shard_updates:
+        return
+    keys = np.concatenate([keys for keys, _ in shard_updates])
+    deltas = np.concatenate([deltas for _, deltas in shard_updates])
+    unique_keys, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    totals = np.zeros((len(unique_keys), deltas.shape[1]), dtype=np.float32)
+    np.add.at(totals, inverse, deltas)
+    rows = table.get_rows(unique_keys, deltas.shape[1])
+    table.values[rows] += totals / counts[:, None]
+
+
+def train_parallel(player1, player2, total_episodes, workers=None, sync_interval=2000, num_envs=256,
+                   epsilon=0.1, seed=0, rows=6, cols=7, report=print):
+    """Trains two QLearningPlayers by parallel self-play. Every round the master tables are
+    saved as memory-mapped snapshots, each worker plays its share of sync_interval
+    episodes against them, and the workers' updates are averaged into the master tables.
+    Returns one statistics dict per round."""
+    workers = workers or os.cpu_count()
+    stats = []
+    with tempfile.TemporaryDirectory() as snapshot_dir, multiprocessing.Pool(workers) as pool:
+        paths = [os.path.join(snapshot_dir, f"player{number}.c4q") for number in (1, 2)]
+        for player in (player1, player2):
+            if player.stateAction_values.cols is None:
+                player.stateAction_values.cols = cols
+                player.stateAction_values.reserve(1024)
+        played = 0
+        round_number = 0
+        start = time.perf_counter()
+        while played < total_episodes:
+            round_start = time.perf_counter()
+            states_before = len(player1.stateAction_values) + len(player2.stateAction_values)
+            episodes = min(sync_interval, total_episodes - played)
+            player1.save(paths[0])
+            player2.save(paths[1])
+            shares = [episodes // workers + (1 if i < episodes % workers else 0) for i in range(workers)]
+            tasks = [(paths, share, min(num_envs, share), seed + round_number * workers + i, epsilon, rows, cols)
+                     for i, share in enumerate(shares) if share]
+            results = pool.map(train_shard, tasks)
+            merge_updates(player1.stateAction_values, [result[0] for result in results])
+            merge_updates(player2.stateAction_values, [result[1] for result in results])
+            played += episodes
+            round_number += 1
+            elapsed = time.perf_counter() - round_start
+            stats.append({
+                "round": round_number,
+                "episodes": played,
+                "episodes_per_sec": episodes / elapsed,
+                "states": (len(player1.stateAction_values), len(player2.stateAction_values)),
+                "new_states": len(player1.stateAction_values) + len(player2.stateAction_values) - states_before,
+                "elapsed": time.perf_counter() - start,
+            })
+            if report:
+                report(f"Round {round_number}: {played} episodes, {episodes / elapsed:.0f} episodes/sec, "
+                       f"states {stats[-1]['states'][0]} / {stats[-1]['states'][1]} (+{stats[-1]['new_states']})")
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train two Q-learning players by parallel self-play.")
+    parser.add_argument("episodes", type=int)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--sync-interval", type=int, default=2000, help="episodes between two merges")
+    parser.add_argument("--epsilon", type=float, default=0.1, help="exploration rate")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", nargs=2, default=("qtable_player1.c4q", "qtable_player2.c4q"),
+                        help="files the trained tables are saved to")
+    args = parser.parse_args(argv)
+
+    from player import QLearningPlayer
+    player1 = QLearningPlayer(1, 1, None)
+    player2 = QLearningPlayer(2, 2, None)
+    train_parallel(player1, player2, args.episodes, args.workers, args.sync_interval,
+                   epsilon=args.epsilon, seed=args.seed)
+    player1.save(args.output[0])
+    player2.save(args.output[1])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+EXACT = 0  # stored value is the exact minimax value
+LOWER = 1  # search failed high, the real value is at least the stored value
+UPPER = 2  # search failed low, the real value is at most the stored value
+
+# Multiplier used to spread position keys over the table (Fibonacci hashing)
+HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+
+
+# TranspositionTable caches search results between transpositions and between moves
+class TranspositionTable:
+    # Rough memory used by one slot: list pointer, entry tuple and its key/value ints
+    ENTRY_BYTES = 160
+
+    def __init__(self, size_mb=16):
+        entries = max(1, int(size_mb * 1024 * 1024) // self.ENTRY_BYTES)
+        self.size = 1 << (entries.bit_length() - 1)  # round down to a power of two
+        self.index_mask = self.size - 1
+        self.generation = 0
+        self.clear()
+
+    def clear(self):
+        """Drops every entry and resets the counters."""
+        self.entries = [None] * self.size
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.replacements = 0
+        self.rejected = 0
+
+    def new_search(self):
+        """Starts a new search generation so entries from older searches age out first."""
+        self.generation += 1
+
+    def probe(self, key):
+        """Returns (depth, flag, value, move) stored for key, or None."""
+        entry = self.entries[((key * HASH_MULTIPLIER) >> 32) & self.index_mask]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry[1:5]
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, flag, value, move):
+        """Stores a search result, keeping deeper results from the current search."""
+        index = ((key * HASH_MULTIPLIER) >> 32) & self.index_mask
+        entry = self.entries[index]
+        if entry is not None and entry[0] != key:
+            # Replacement policy: an entry from an older search is always replaced,
+            # one from the current search only by a result at least as deep.
+            if entry[5] == self.generation and entry[1] > depth:
+                self.rejected += 1
+                return
+            self.replacements += 1
+        self.entries[index] = (key, depth, flag, value, move, self.generation)
+        self.stores += 1
+
+    def hit_rate(self):
+        probes = self.hits + self.misses
+        return self.hits / probes if probes else 0.0
+
+    def usage(self):
+        """Returns the fraction of slots in use."""
+        return sum(entry is not None for entry in self.entries) / self.size
@@ -0,0 +1,190 @@
+import numpy as np
+from symmetry import canonical_keys, canonical_index
+
+CONNECT = 4
+# Line directions as (row step, column step): horizontal, vertical and both diagonals
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+
+# VectorEnv steps many Connect Four games at once, one array lane per game. Results use
+# the Board.winner_value convention: 0 ongoing, 1 or 2 for the winning piece, 3 for a draw.
+class VectorEnv:
+    def __init__(self, num_games, rows=6, cols=7, seed=None, auto_reset=True, connect=CONNECT):
+        self.num_games = num_games
+        self.rows = rows
+        self.cols = cols
+        self.connect = connect
+        self.auto_reset = auto_reset
+        self.rng = np.random.default_rng(seed)
+        # Boards are a view into a zero-padded array so line checks never leave the array
+        pad = connect - 1
+        self.padded = np.zeros((num_games, rows + 2 * pad, cols + 2 * pad), dtype=np.int8)
+        self.boards = self.padded[:, pad:pad + rows, pad:pad + cols]
+        self.heights = np.zeros((num_games, cols), dtype=np.int16)
+        self.turn = np.ones(num_games, dtype=np.int8)  # piece to move in each game
+        self.move_counts = np.zeros(num_games, dtype=np.int16)
+        self.lanes = np.arange(num_games)
+        self.final_boards = np.zeros((num_games, rows, cols), dtype=np.int8)
+        self.reset()
+
+    def reset(self, lanes=None):
+        """Clears the given lanes (all by default); the piece moving first is random."""
+        if lanes is None:
+            lanes = self.lanes
+        self.padded[lanes] = 0
+        self.heights[lanes] = 0
+        self.move_counts[lanes] = 0
+        self.turn[lanes] = self.rng.integers(1, 3, size=len(lanes))
+
+    def valid_mask(self):
+        """Returns a (num_games, cols) bool array of playable columns."""
+        return self.heights < self.rows
+
+    def set_position(self, lanes, board, piece):
+        """Copies a Board position, with piece to move, into the given lanes."""
+        self.boards[lanes] = board.board
+        self.heights[lanes] = board.heights
+        self.move_counts[lanes] = len(board.moves)
+        self.turn[lanes] = piece
+
+    def step(self, actions, lanes=None):
+        """Drops the side to move's piece into actions[i] in every lane (or in lanes[i]
+        when lanes is given) and returns the results. Finished lanes are saved in
+        final_boards and, with auto_reset, restarted."""
+        actions = np.asarray(actions)
+        lanes = self.lanes if lanes is None else np.asarray(lanes)
+        heights = self.heights[lanes, actions]
+        if np.any(heights >= self.rows):
+            raise ValueError("Move into a full column")
+        pieces = self.turn[lanes].copy()
+        rows = self.rows - 1 - heights
+        self.boards[lanes, rows, actions] = pieces
+        self.heights[lanes, actions] += 1
+        self.move_counts[lanes] += 1
+
+        wins = self.wins_through(rows, actions, pieces, lanes)
+        full = self.move_counts[lanes] == self.rows * self.cols
+        results = np.where(wins, pieces, np.where(full, 3, 0)).astype(np.int8)
+        self.turn[lanes] = 3 - pieces
+
+        done = lanes[np.flatnonzero(results)]
+        if len(done):
+            self.final_boards[done] = self.boards[done]
+            if self.auto_reset:
+                self.reset(done)
+        return results
+
+    def wins_through(self, rows, cols, pieces, lanes=None):
+        """Returns which lanes have connect pieces in a line through (rows[i], cols[i])."""
+        if lanes is None:
+            lanes = self.lanes
+        pad = self.connect - 1
+        r = rows + pad
+        c = cols + pad
+        wins = np.zeros(len(lanes), dtype=bool)
+        for dr, dc in DIRECTIONS:
+            line = np.ones(len(lanes), dtype=np.int16)
+            for sign in (1, -1):
+                run = np.ones(len(lanes), dtype=bool)
+                for k in range(1, self.connect):
+                    run &= self.padded[lanes, r + sign * k * dr, c + sign * k * dc] == pieces
+                    line += run
+            wins |= line >= self.connect
+        return wins
+
+    def position_keys(self, boards=None):
+        """Returns Board.position_key for every lane as int64 (boards up to 62 bits)."""
+        if boards is None:
+            boards = self.boards
+        stride = self.rows + 1
+        if stride * self.cols > 62:
+            raise ValueError("Position keys of this board size do not fit in int64")
+        # Cell (r, c) is bit c * stride + (rows - 1 - r); piece 1 counts twice in the key
+        heights = self.rows - 1 - np.arange(self.rows)
+        bits = np.left_shift(1, np.arange(self.cols)[None, :] * stride + heights[:, None]).astype(np.int64)
+        bottom = sum(1 << (c * stride) for c in range(self.cols))
+        weights = np.array([0, 2, 1], dtype=np.int64)[boards]
+        return (weights.reshape(len(boards), -1) @ bits.ravel()) + bottom
+
+
+# RandomPolicy picks a uniformly random valid column in every lane at once
+class RandomPolicy:
+    def __init__(self, seed=None):
+        self.rng = np.random.default_rng(seed)
+
+    def __call__(self, env, lanes):
+        noise = self.rng.random((len(lanes), env.cols))
+        noise[~env.valid_mask()[lanes]] = -1.0
+        return noise.argmax(axis=1)
+
+    def finish(self, env, lanes, results):
+        pass
+
+
+# QLearningPolicy plays greedily from a QLearningPlayer's table and updates it when each game ends
+class QLearningPolicy:
+    def __init__(self, player, num_games, epsilon=0.0, seed=None):
+        self.player = player
+        self.histories = [[] for _ in range(num_games)]
+        self.epsilon = epsilon  # chance of exploring with a random valid move
+        self.rng = np.random.default_rng(seed)
+
+    def __call__(self, env, lanes):
+        # Look up every lane's state in the Q-table at once; mirror images share a row,
+        # stored in the orientation of the canonical key
+        keys, mirrored = canonical_keys(env.position_keys(env.boards[lanes]), env.rows, env.cols)
+        rows = self.player.stateAction_values.get_rows(keys, env.cols)
+        q_values = self.player.stateAction_values.values[rows]
+        q_values[mirrored] = q_values[mirrored, ::-1]
+        # Highest Q-value among the valid columns, first column on ties
+        valid = env.valid_mask()[lanes]
+        q_values[~valid] = -np.inf
+        actions = q_values.argmax(axis=1)
+        if self.epsilon:
+            explore = self.rng.random(len(lanes)) < self.epsilon
+            noise = self.rng.random((len(lanes), env.cols))
+            noise[~valid] = -1.0
+            actions[explore] = noise[explore].argmax(axis=1)
+        indices = canonical_index(keys, mirrored)
+        for lane, index, action in zip(lanes.tolist(), indices.tolist(), actions.tolist()):
+            self.histories[lane].append((index, action))
+        return actions
+
+    def finish(self, env, lanes, results):
+        for lane, result in zip(lanes, results):
+            self.player.learn(self.histories[lane], self.player.result_reward(result), env.cols)
+            self.histories[lane] = []
+
+
+def policy_for(player, num_games, seed=None, epsilon=0.0):
+    """Returns the batched policy for a RandomPlayer or QLearningPlayer, drawing its
+    random moves (Q-learning explores with probability epsilon) from seed."""
+    from player import QLearningPlayer, RandomPlayer
+    if isinstance(player, QLearningPlayer):
+        return QLearningPolicy(player, num_games, epsilon, seed)
+    if isinstance(player, RandomPlayer):
+        return RandomPolicy(seed)
+    raise TypeError(f"No batched policy for {type(player).__name__}")
+
+
+def self_play(env, policies, total_games):
+    """Steps env until total_games games have finished. policies maps each piece to a
+    policy called with (env, lanes) for the lanes where that piece is to move.
+    Returns result counts indexed like winner_value (1, 2, 3) and the game lengths."""
+    counts = np.zeros(4, dtype=np.int64)
+    lengths = []
+    actions = np.zeros(env.num_games, dtype=np.int64)
+    while counts.sum() < total_games:
+        for piece, policy in policies.items():
+            lanes = np.flatnonzero(env.turn == piece)
+            if len(lanes):
+                actions[lanes] = policy(env, lanes)
+        game_lengths = env.move_counts + 1
+        results = env.step(actions)
+        done = np.flatnonzero(results)
+        if len(done):
+            for policy in policies.values():
+                policy.finish(env, done, results[done])
+            counts += np.bincount(results[done], minlength=4)
+            lengths.extend(game_lengths[done].tolist())
+    return counts, lengths